@@ -0,0 +1,45 @@
+"""Ordena os itens pendentes do refresh pela chance de terem mudado.
+
+Para cada item combina:
+- a idade da publicação: compras recentes mudam de situação com mais
+  frequência, então ela define a chance "a priori" de mudança;
+- a taxa de mudança observada nas verificações anteriores, que substitui
+  aos poucos a estimativa a priori conforme o histórico cresce;
+- o tempo desde a última verificação (ou desde a publicação, se nunca
+  verificado), com efeito saturando após algumas semanas.
+"""
+import math
+from datetime import datetime
+
+MEIA_VIDA_PUBLICACAO_DIAS = 30
+ESCALA_VERIFICACAO_DIAS = 7
+PESO_PRIORI = 2
+
+
+def _dias_desde(iso, agora):
+    if not iso:
+        return None
+    try:
+        return max(0.0, (agora - datetime.fromisoformat(iso)).total_seconds() / 86400)
+    except ValueError:
+        return None
+
+
+def prioridade(pendente, agora=None):
+    agora = agora or datetime.now()
+    idade = _dias_desde(pendente["dataPublicacao"], agora)
+    if idade is None:
+        idade = _dias_desde(pendente["atualizadoEm"], agora) or 0.0
+    desde_verificacao = _dias_desde(pendente["ultimaVerificacao"], agora)
+    if desde_verificacao is None:
+        desde_verificacao = idade
+
+    recencia = 1 / (1 + idade / MEIA_VIDA_PUBLICACAO_DIAS)
+    chance_mudanca = (pendente["mudancas"] + PESO_PRIORI * recencia) / (pendente["verificacoes"] + PESO_PRIORI)
+    defasagem = 1 - math.exp(-desde_verificacao / ESCALA_VERIFICACAO_DIAS)
+    return defasagem * chance_mudanca
+
+
+def ordenar_por_prioridade(pendentes, agora=None):
+    agora = agora or datetime.now()
+    return sorted(pendentes, key=lambda p: prioridade(p, agora), reverse=True)
@@ -0,0 +1,84 @@
+"""Agregados pré-calculados do banco de itens, para o index.html não recalcular no navegador.
+
+Carrega as colunas necessárias direto do SQLite (json_extract) em um
+DataFrame tipado, com as colunas repetitivas como `category`, e grava em
+`dados/resumo.json`:
+- gasto homologado por ano, por modalidade (também por ano) e por vencedor;
+- economia: valor estimado x homologado dos itens com resultado;
+- distribuição das situações dos itens, no geral e por ano.
+"""
+import json
+import os
+
+import pandas as pd
+
+from exportacao import DIRETORIO_EXPORTACAO
+
+RESUMO_FILE = 'resumo.json'
+QUANTIDADE_VENCEDORES = 20
+
+CATEGORICAS = ["ano", "modalidade", "vencedor", "cnpjVencedor", "situacaoItem"]
+NUMERICAS = ["valorTotalEstimado", "valorTotalHomologado"]
+
+
+def carregar_dataframe(armazem):
+    colunas = ", ".join(f"json_extract(registro, '$.{c}') AS {c}" for c in CATEGORICAS + NUMERICAS)
+    df = pd.read_sql_query(f"SELECT {colunas} FROM itens", armazem.conn)
+    for coluna in NUMERICAS:
+        df[coluna] = pd.to_numeric(df[coluna], errors="coerce").fillna(0.0).astype("float64")
+    for coluna in CATEGORICAS:
+        df[coluna] = df[coluna].astype("string").fillna("").astype("category")
+    # "SEM RESULTADO" e valor zero significam item ainda sem homologação
+    df["homologado"] = df["valorTotalHomologado"] > 0
+    return df
+
+
+def agregar(df, por):
+    """Totais por `por` (coluna ou lista de colunas), com a economia dos itens homologados."""
+    base = df.assign(
+        estimadoHomologados=df["valorTotalEstimado"].where(df["homologado"], 0.0),
+        itensHomologados=df["homologado"].astype("int64"),
+    )
+    tabela = base.groupby(por, observed=True).agg(
+        itens=("valorTotalEstimado", "size"),
+        itensHomologados=("itensHomologados", "sum"),
+        valorEstimado=("valorTotalEstimado", "sum"),
+        valorHomologado=("valorTotalHomologado", "sum"),
+        estimadoHomologados=("estimadoHomologados", "sum"),
+    )
+    tabela["economia"] = tabela["estimadoHomologados"] - tabela["valorHomologado"]
+    tabela["economiaPercentual"] = (tabela["economia"] / tabela["estimadoHomologados"].where(tabela["estimadoHomologados"] > 0)
+                                    * 100).fillna(0.0)
+    return tabela.drop(columns="estimadoHomologados").round(2).reset_index()
+
+
+def _registros(tabela):
+    return json.loads(tabela.to_json(orient="records", force_ascii=False))
+
+
+def resumir(df, gerado_em=None):
+    geral = agregar(df.assign(todos=0), "todos").drop(columns="todos")
+    vencedores = agregar(df[df["homologado"]], ["vencedor", "cnpjVencedor"])
+    situacoes = df.groupby("situacaoItem", observed=True).size().rename("itens").reset_index()
+    situacoes_ano = df.groupby(["ano", "situacaoItem"], observed=True).size().rename("itens").reset_index()
+    return {
+        "geradoEm": gerado_em,
+        "geral": _registros(geral)[0] if len(geral) else {},
+        "porAno": _registros(agregar(df, "ano").sort_values("ano", ascending=False)),
+        "porModalidade": _registros(agregar(df, "modalidade").sort_values("valorHomologado", ascending=False)),
+        "porModalidadeAno": _registros(agregar(df, ["ano", "modalidade"])),
+        "topVencedores": _registros(vencedores.nlargest(QUANTIDADE_VENCEDORES, "valorHomologado")),
+        "situacoes": _registros(situacoes.sort_values("itens", ascending=False)),
+        "situacoesPorAno": _registros(situacoes_ano),
+    }
+
+
+def exportar_resumo(armazem, diretorio=DIRETORIO_EXPORTACAO):
+    os.makedirs(diretorio, exist_ok=True)
+    resumo = resumir(carregar_dataframe(armazem), armazem.ultima_atualizacao())
+    caminho = os.path.join(diretorio, RESUMO_FILE)
+    temporario = f"{caminho}.tmp"
+    with open(temporario, 'w', encoding='utf-8') as f:
+        json.dump(resumo, f, ensure_ascii=False, separators=(',', ':'))
+    os.replace(temporario, caminho)
+    return resumo
@@ -0,0 +1,266 @@
+import json
+import os
+import re
+import sqlite3
+from datetime import datetime
+
+from modelo import CAMPOS_DATA, Item, normalizar_data, registro_legado
+
+DB_FILE = 'dados.sqlite'
+
+
+def chave_registro(item):
+    """(cnpj, ano, sequencial, itemNo) de um registro no formato do dados.json."""
+    match = re.search(r'editais/(\d+)/(\d+)/(\d+)', item.get('linkPNCP') or '')
+    if not match:
+        return None
+    return match.groups() + (str(item.get('itemNo')),)
+
+
+def data_iso(data):
+    """ISO ordenável de uma data em ISO ou no formato legado "Mon Dec 01 2025 10:00:00 GMT-0300 (...)"."""
+    return normalizar_data(data) or None
+
+
+class ArmazemItens:
+    """Armazena os itens em SQLite, um registro por (cnpj, ano, sequencial, itemNo).
+
+    O registro plano (os campos do dados.json, com datas em ISO) fica
+    serializado na coluna `registro`;
+    as colunas de situação e data de publicação existem para os índices.
+    O dados.json passa a ser só uma exportação (`exportar_json`).
+    """
+
+    def __init__(self, caminho=DB_FILE):
+        self.caminho = caminho
+        self.conn = sqlite3.connect(caminho)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS itens (
+                cnpj TEXT NOT NULL,
+                ano TEXT NOT NULL,
+                sequencial TEXT NOT NULL,
+                itemNo TEXT NOT NULL,
+                situacaoItem TEXT,
+                dataPublicacao TEXT,
+                registro TEXT NOT NULL,
+                atualizado_em TEXT NOT NULL,
+                PRIMARY KEY (cnpj, ano, sequencial, itemNo)
+            )
+        """)
+        self.conn.execute("CREATE INDEX IF NOT EXISTS idx_itens_situacao ON itens (situacaoItem)")
+        self.conn.execute("CREATE INDEX IF NOT EXISTS idx_itens_publicacao ON itens (dataPublicacao)")
+        # Histórico de verificações do refresh, usado pelo agendador
+        self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS verificacoes (
+                cnpj TEXT NOT NULL,
+                ano TEXT NOT NULL,
+                sequencial TEXT NOT NULL,
+                itemNo TEXT NOT NULL,
+                ultima_verificacao TEXT NOT NULL,
+                ultima_mudanca TEXT,
+                total_verificacoes INTEGER NOT NULL DEFAULT 0,
+                total_mudancas INTEGER NOT NULL DEFAULT 0,
+                PRIMARY KEY (cnpj, ano, sequencial, itemNo)
+            )
+        """)
+        # Log append-only das mudanças detectadas pelo importador e pelo refresh.
+        # campo '*' é um item novo (novo = registro inteiro); valores em JSON.
+        self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS mudancas (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                cnpj TEXT NOT NULL,
+                ano TEXT NOT NULL,
+                sequencial TEXT NOT NULL,
+                itemNo TEXT NOT NULL,
+                campo TEXT NOT NULL,
+                anterior TEXT,
+                novo TEXT,
+                registrado_em TEXT NOT NULL
+            )
+        """)
+        self.conn.execute("CREATE INDEX IF NOT EXISTS idx_mudancas_registro ON mudancas (registrado_em)")
+        self.conn.commit()
+
+    def contar(self):
+        return self.conn.execute("SELECT COUNT(*) FROM itens").fetchone()[0]
+
+    def ultima_atualizacao(self):
+        """Momento da última mudança nos itens (o upsert só toca atualizado_em quando o registro muda)."""
+        return self.conn.execute("SELECT MAX(atualizado_em) FROM itens").fetchone()[0]
+
+    def upsert(self, registros, registrar_mudancas=True):
+        """Insere ou atualiza registros (dicts ou modelo.Item); retorna quantas linhas mudaram de fato.
+
+        Com `registrar_mudancas`, cada campo alterado (ou item novo) vai para a tabela `mudancas`.
+        """
+        agora = datetime.now().isoformat()
+        antes = self.conn.total_changes
+        linhas, mudancas = [], []
+        for item in registros:
+            if isinstance(item, Item):
+                item = item.para_registro()
+            chave = chave_registro(item)
+            if chave is None:
+                continue
+            registro = json.dumps(item, ensure_ascii=False)
+            linhas.append(chave + (
+                item.get('situacaoItem'),
+                data_iso(item.get('dataPublicacao')),
+                registro,
+                agora,
+            ))
+            if registrar_mudancas:
+                mudancas.extend(chave + diferenca + (agora,) for diferenca in self._diferencas(chave, item, registro))
+        self.conn.executemany("""
+            INSERT INTO itens (cnpj, ano, sequencial, itemNo, situacaoItem, dataPublicacao, registro, atualizado_em)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+            ON CONFLICT (cnpj, ano, sequencial, itemNo) DO UPDATE SET
+                situacaoItem = excluded.situacaoItem,
+                dataPublicacao = excluded.dataPublicacao,
+                registro = excluded.registro,
+                atualizado_em = excluded.atualizado_em
+            WHERE registro != excluded.registro
+        """, linhas)
+        alteradas = self.conn.total_changes - antes
+        self.conn.executemany("""
+            INSERT INTO mudancas (cnpj, ano, sequencial, itemNo, campo, anterior, novo, registrado_em)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+        """, mudancas)
+        self.conn.commit()
+        return alteradas
+
+    def _diferencas(self, chave, item, registro):
+        """(campo, anterior, novo) em JSON de cada campo que muda em relação ao banco."""
+        linha = self.conn.execute(
+            "SELECT registro FROM itens WHERE cnpj = ? AND ano = ? AND sequencial = ? AND itemNo = ?", chave
+        ).fetchone()
+        if linha is None:
+            return [("*", None, registro)]
+        if linha[0] == registro:
+            return []
+        antigo = json.loads(linha[0])
+        diferencas = []
+        for campo in list(item) + [c for c in antigo if c not in item]:
+            anterior, novo = antigo.get(campo), item.get(campo)
+            if campo in CAMPOS_DATA:
+                # Registros antigos têm a data no formato legado; só o valor conta
+                if normalizar_data(anterior) == normalizar_data(novo):
+                    continue
+            elif anterior == novo:
+                continue
+            diferencas.append((campo, json.dumps(anterior, ensure_ascii=False), json.dumps(novo, ensure_ascii=False)))
+        return diferencas
+
+    def mudancas_por_dia(self, desde):
+        """{dia (AAAA-MM-DD): [mudanças em ordem]} registradas a partir de `desde` (ISO)."""
+        cursor = self.conn.execute("""
+            SELECT cnpj, ano, sequencial, itemNo, campo, anterior, novo, registrado_em
+            FROM mudancas WHERE registrado_em >= ? ORDER BY id
+        """, (desde,))
+        dias = {}
+        for cnpj, ano, sequencial, item_no, campo, anterior, novo, registrado_em in cursor:
+            dias.setdefault(registrado_em[:10], []).append({
+                "chave": f"{cnpj}/{ano}/{sequencial}/{item_no}",
+                "campo": campo,
+                "anterior": json.loads(anterior) if anterior is not None else None,
+                "novo": json.loads(novo) if novo is not None else None,
+                "em": registrado_em,
+            })
+        return dias
+
+    def chaves_compras(self):
+        return set(self.conn.execute("SELECT DISTINCT cnpj, ano, sequencial FROM itens"))
+
+    def por_situacao(self, situacoes):
+        marcadores = ",".join("?" * len(situacoes))
+        cursor = self.conn.execute(
+            f"SELECT registro FROM itens WHERE situacaoItem IN ({marcadores}) ORDER BY rowid", list(situacoes)
+        )
+        return [json.loads(registro) for (registro,) in cursor]
+
+    def pendentes_com_agenda(self, situacoes):
+        """Itens nas situações dadas com o histórico de verificações (ou None se nunca verificados)."""
+        marcadores = ",".join("?" * len(situacoes))
+        cursor = self.conn.execute(f"""
+            SELECT i.registro, i.dataPublicacao, i.atualizado_em,
+                   v.ultima_verificacao, v.total_verificacoes, v.total_mudancas
+            FROM itens i
+            LEFT JOIN verificacoes v USING (cnpj, ano, sequencial, itemNo)
+            WHERE i.situacaoItem IN ({marcadores})
+        """, list(situacoes))
+        return [
+            {
+                "registro": json.loads(registro),
+                "dataPublicacao": publicacao,
+                "atualizadoEm": atualizado,
+                "ultimaVerificacao": verificacao,
+                "verificacoes": verificacoes or 0,
+                "mudancas": mudancas or 0,
+            }
+            for registro, publicacao, atualizado, verificacao, verificacoes, mudancas in cursor
+        ]
+
+    def registrar_verificacoes(self, verificacoes):
+        """Grava uma lista de (registro, mudou) verificados pelo refresh."""
+        agora = datetime.now().isoformat()
+        linhas = []
+        for item, mudou in verificacoes:
+            chave = chave_registro(item)
+            if chave is None:
+                continue
+            linhas.append(chave + (agora, agora if mudou else None, int(mudou)))
+        self.conn.executemany("""
+            INSERT INTO verificacoes (cnpj, ano, sequencial, itemNo, ultima_verificacao, ultima_mudanca,
+                                      total_verificacoes, total_mudancas)
+            VALUES (?, ?, ?, ?, ?, ?, 1, ?)
+            ON CONFLICT (cnpj, ano, sequencial, itemNo) DO UPDATE SET
+                ultima_verificacao = excluded.ultima_verificacao,
+                ultima_mudanca = COALESCE(excluded.ultima_mudanca, ultima_mudanca),
+                total_verificacoes = total_verificacoes + 1,
+                total_mudancas = total_mudancas + excluded.total_mudancas
+        """, linhas)
+        self.conn.commit()
+
+    def iterar(self, ano=None):
+        """Registros na ordem de inserção (a mesma do dados.json legado)."""
+        if ano is None:
+            cursor = self.conn.execute("SELECT registro FROM itens ORDER BY rowid")
+        else:
+            cursor = self.conn.execute("SELECT registro FROM itens WHERE ano = ? ORDER BY rowid", (str(ano),))
+        for (registro,) in cursor:
+            yield json.loads(registro)
+
+    def anos(self):
+        return [ano for (ano,) in self.conn.execute("SELECT DISTINCT ano FROM itens ORDER BY ano")]
+
+    def ultimos(self, quantidade):
+        cursor = self.conn.execute("SELECT registro FROM itens ORDER BY rowid DESC LIMIT ?", (quantidade,))
+        return [json.loads(registro) for (registro,) in cursor]
+
+    def semear_de_json(self, caminho_json):
+        """Carrega o dados.json existente quando o banco ainda está vazio."""
+        if self.contar() or not os.path.exists(caminho_json):
+            return 0
+        with open(caminho_json, 'r', encoding='utf-8') as f:
+            content = json.load(f)
+        dados = content.get('data', []) if isinstance(content, dict) else content
+        return self.upsert(dados, registrar_mudancas=False)
+
+    def exportar_json(self, caminho_json):
+        """Gera o dados.json lido pelo index.html, um registro por linha para diffs pequenos."""
+        temporario = f"{caminho_json}.tmp"
+        total = self.contar()
+        with open(temporario, 'w', encoding='utf-8') as f:
+            # geradoEm vem dos dados: sem mudança nos itens, o arquivo sai idêntico e não gera commit
+            cabecalho = {"geradoEm": self.ultima_atualizacao(), "totalRegistros": total}
+            f.write(json.dumps(cabecalho, ensure_ascii=False)[:-1] + ', "data": [\n')
+            for posicao, item in enumerate(self.iterar()):
+                f.write(json.dumps(registro_legado(item), ensure_ascii=False))
+                f.write(",\n" if posicao < total - 1 else "\n")
+            f.write("]}\n")
+        os.replace(temporario, caminho_json)
+        return total
+
+    def fechar(self):
+        self.conn.close()
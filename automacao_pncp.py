@@ -1,153 +1,25 @@
-import requests
-import json
-import time
-import os
-import locale
+import argparse
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta
-from requests.adapters import HTTPAdapter
-from urllib3.util.retry import Retry
-
-# Tenta configurar para inglês para garantir que a data saia como "Mon Dec"
-try:
-    locale.setlocale(locale.LC_TIME, 'en_US.UTF-8')
-except:
-    pass 
-
-class PNCPImporter:
-    BASE_URL_CONSULTA = "https://pncp.gov.br/api/consulta"
-    BASE_URL_INTEGRACAO = "https://pncp.gov.br/api/pncp"
-    
-    def __init__(self, cnpj="13650403000128"):
-        self.cnpj = cnpj
-        self.session = self.setup_session()
-        self.cooldown_time = 1.0
-
-    def setup_session(self):
-        session = requests.Session()
-        retry_strategy = Retry(
-            total=5,
-            backoff_factor=1,
-            status_forcelist=[429, 500, 502, 503, 504],
-            allowed_methods=["GET"]
-        )
-        adapter = HTTPAdapter(max_retries=retry_strategy)
-        session.mount("https://", adapter)
-        session.headers.update({
-            "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) Bot-Sincronizador-PNCP",
-            "Accept": "application/json"
-        })
-        return session
-
-    def _safe_request(self, url, params=None):
-        try:
-            time.sleep(self.cooldown_time)
-            response = self.session.get(url, params=params, timeout=30)
-            if response.status_code == 200:
-                return response.json()
-            return None
-        except Exception as e:
-            print(f"Erro na requisição: {e}")
-            return None
-
-    def listar_contratacoes(self, data_inicial, data_final, pagina=1, modalidade=None):
-        url = f"{self.BASE_URL_CONSULTA}/v1/contratacoes/publicacao"
-        params = {
-            "dataInicial": data_inicial,
-            "dataFinal": data_final,
-            "pagina": pagina,
-            "tamanhoPagina": 10,
-            "cnpj": self.cnpj
-        }
-        if modalidade:
-            params["codigoModalidadeContratacao"] = modalidade
-        return self._safe_request(url, params=params)
-
-    def obter_itens_contratacao(self, cnpj, ano, sequencial):
-        url = f"{self.BASE_URL_INTEGRACAO}/v1/orgaos/{cnpj}/compras/{ano}/{sequencial}/itens"
-        itens_completos = []
-        pagina = 1
-        while True:
-            params = {"pagina": pagina, "tamanhoPagina": 100}
-            dados = self._safe_request(url, params=params)
-            if not dados: break
-            
-            items_list = []
-            if isinstance(dados, list): items_list = dados
-            elif isinstance(dados, dict): items_list = dados.get('data') or dados.get('resultado') or []
-            
-            if not items_list:
-                if isinstance(dados, dict) and 'numeroItem' in dados: items_list = [dados]
-                else: break
-                
-            itens_completos.extend(items_list)
-            if len(items_list) < 100: break
-            pagina += 1
-        return itens_completos
-
-    def obter_resultados_item(self, cnpj, ano, sequencial, numero_item):
-        url = f"{self.BASE_URL_INTEGRACAO}/v1/orgaos/{cnpj}/compras/{ano}/{sequencial}/itens/{numero_item}/resultados"
-        resultados = self._safe_request(url)
-        if isinstance(resultados, list): return resultados
-        if isinstance(resultados, dict): return [resultados]
-        return []
-
-    def formatar_para_html(self, contratacao, item):
-        """Achata a estrutura para manter compatibilidade com o HTML antigo"""
-        try:
-            # Formata datas
-            dt_pub_raw = contratacao.get('dataPublicacaoPncp', '')
-            dt_pub_fmt = ""
-            if dt_pub_raw:
-                dt_obj = datetime.fromisoformat(dt_pub_raw.replace('Z', '+00:00'))
-                dt_pub_fmt = dt_obj.strftime("%a %b %d %Y %H:%M:%S GMT-0300 (Brasilia Standard Time)")
-
-            # Pega vencedor do primeiro resultado se existir
-            vencedor_nome = "SEM RESULTADO"
-            vencedor_cnpj = ""
-            valor_unit_homologado = 0
-            valor_total_homologado = 0
-            qtd_homologada = 0
-            data_resultado_fmt = ""
-
-            resultados = item.get('resultados_vencedores', [])
-            if resultados:
-                res = resultados[0]
-                vencedor_nome = res.get('nomeRazaoSocialFornecedor', "SEM RESULTADO")
-                vencedor_cnpj = res.get('niFornecedor', "")
-                valor_unit_homologado = res.get('valorUnitarioHomologado', 0)
-                valor_total_homologado = res.get('valorTotalHomologado', 0)
-                qtd_homologada = res.get('quantidadeHomologada', 0)
-                dt_res_raw = res.get('dataResultado', '')
-                if dt_res_raw:
-                    dt_res_obj = datetime.fromisoformat(dt_res_raw.replace('Z', '+00:00'))
-                    data_resultado_fmt = dt_res_obj.strftime("%a %b %d %Y %H:%M:%S GMT-0300 (Brasilia Standard Time)")
-
-            return {
-                "orgao": contratacao.get('orgaoEntidade', {}).get('razaoSocial', ""),
-                "ano": contratacao.get('anoCompra'),
-                "compra": contratacao.get('numeroCompra', ""),
-                "modalidade": contratacao.get('modalidadeNome', ""),
-                "objeto": contratacao.get('objetoCompra', ""),
-                "itemNo": item.get('numeroItem'),
-                "descricao": item.get('descricao', ""),
-                "quantidade": item.get('quantidade', 0),
-                "unidade": item.get('unidadeMedida', ""),
-                "valorUnitEstimado": item.get('valorUnitarioEstimado', 0),
-                "valorTotalEstimado": item.get('valorTotal', 0),
-                "vencedor": vencedor_nome,
-                "cnpjVencedor": vencedor_cnpj,
-                "valorUnitHomologado": valor_unit_homologado,
-                "valorTotalHomologado": valor_total_homologado,
-                "qtdHomologada": qtd_homologada,
-                "situacaoItem": item.get('situacaoCompraItemNome', ""),
-                "linkPNCP": f"https://pncp.gov.br/app/editais/{contratacao.get('orgaoEntidade', {}).get('cnpj')}/{contratacao.get('anoCompra')}/{contratacao.get('sequencialCompra')}",
-                "processo": contratacao.get('processo', ""),
-                "dataPublicacao": dt_pub_fmt,
-                "dataResultado": data_resultado_fmt
-            }
-        except Exception as e:
-            print(f"Erro na formatação: {e}")
-            return None
+
+from armazenamento import ArmazemItens
+from cache_http import CacheRespostas
+from cliente_pncp import ClientePNCP
+from estado_sync import EstadoSync
+from fila_falhas import FilaFalhas
+from instrumentacao import executar_com_relatorio
+
+MODALIDADES = [1, 2, 3, 4, 5, 6, 8, 9, 10, 11, 12, 13]
+LIMITE_PAGINAS_PARTICAO = 10  # acima disso a partição é dividida em períodos menores
+JANELA_MAXIMA_DIAS = 365
+
+class PNCPImporter(ClientePNCP):
+    def __init__(self, cnpj="13650403000128", max_workers=8, **kwargs):
+        super().__init__(cnpj, max_workers, **kwargs)
+        self.executor_compras = ThreadPoolExecutor(max_workers=max(1, max_workers // 2))
+        # Listagem das partições (modalidade x período); páginas extras vão para executor_itens.
+        self.executor_listagem = ThreadPoolExecutor(max_workers=max(1, max_workers // 2))
 
     def processar_contratacao_completa(self, contratacao):
         try:
@@ -158,111 +30,338 @@ class PNCPImporter:
             print(f"  -> Detalhando {ano}/{sequencial}...")
             itens = self.obter_itens_contratacao(cnpj_orgao, ano, sequencial)
             
-            itens_achatados = []
-            for item in itens:
+            def buscar_resultados(item):
                 num = item.get('numeroItem')
                 if num:
                     item['resultados_vencedores'] = self.obter_resultados_item(cnpj_orgao, ano, sequencial, num)
-                
-                # Cria uma entrada para cada item no formato antigo
-                item_formatado = self.formatar_para_html(contratacao, item)
-                if item_formatado:
-                    itens_achatados.append(item_formatado)
+                return item
             
-            return itens_achatados
+            return self.montar_itens(contratacao, self.executor_itens.map(buscar_resultados, itens))
         except Exception as e:
             print(f"Erro no detalhamento: {e}")
             return []
 
-    def importar_tudo(self, d_ini, d_fim):
-        todos_resultados = []
-        modalidades = [1, 2, 3, 4, 5, 6, 8, 9, 10, 11, 12, 13]
-        
-        atual = datetime.strptime(d_ini, "%Y%m%d")
+    @staticmethod
+    def chave_compra(contratacao):
+        return (
+            str(contratacao.get('orgaoEntidade', {}).get('cnpj')),
+            str(contratacao.get('anoCompra')),
+            str(contratacao.get('sequencialCompra')),
+        )
+
+    def planejar_particoes(self, d_ini, d_fim, estado=None):
+        """Partições iniciais da listagem: uma por modalidade, em ordem, cobrindo o período.
+
+        Com `estado`, aplica a marca d'água por modalidade (se o run for
+        incremental) e pula o que o checkpoint já cobriu.
+        """
+        checkpoint = estado.checkpoint if estado else None
+        incremental = bool(checkpoint and checkpoint['incremental'])
+        retomada = checkpoint if checkpoint and checkpoint.get('modalidade') and checkpoint.get('versao') == 2 else None
         fim_obj = datetime.strptime(d_fim, "%Y%m%d")
         
-        while atual <= fim_obj:
-            bloco_fim = min(atual + timedelta(days=14), fim_obj)
-            s_ini, s_fim = atual.strftime("%Y%m%d"), bloco_fim.strftime("%Y%m%d")
-            print(f"\n--- Periodo: {s_ini} a {s_fim} ---")
+        particoes = []
+        for mod in MODALIDADES:
+            m_ini = d_ini
+            if retomada:
+                if mod < retomada['modalidade']: continue
+                if mod == retomada['modalidade']: m_ini = max(m_ini, retomada['janela'])
+            inicio_mod = estado.inicio_modalidade(mod) if incremental else None
+            if inicio_mod:
+                if inicio_mod > d_fim: continue
+                m_ini = max(m_ini, inicio_mod)
+            
+            atual = datetime.strptime(m_ini, "%Y%m%d")
+            while atual <= fim_obj:
+                bloco_fim = min(atual + timedelta(days=JANELA_MAXIMA_DIAS - 1), fim_obj)
+                particoes.append((mod, atual.strftime("%Y%m%d"), bloco_fim.strftime("%Y%m%d")))
+                atual = bloco_fim + timedelta(days=1)
+        return particoes
+
+    @staticmethod
+    def dividir_periodo(d_ini, d_fim, partes):
+        """Divide [d_ini, d_fim] em até `partes` períodos contíguos de dias inteiros."""
+        inicio = datetime.strptime(d_ini, "%Y%m%d")
+        dias = (datetime.strptime(d_fim, "%Y%m%d") - inicio).days + 1
+        partes = min(partes, dias)
+        limites = [inicio + timedelta(days=dias * n // partes) for n in range(partes + 1)]
+        return [(limites[n].strftime("%Y%m%d"), (limites[n + 1] - timedelta(days=1)).strftime("%Y%m%d"))
+                for n in range(partes)]
+
+    def listar_particao(self, modalidade, d_ini, d_fim):
+        """Lista uma partição inteira.
+
+        Partição vazia custa uma requisição. Se tiver mais que
+        LIMITE_PAGINAS_PARTICAO páginas e mais de um dia, não é listada:
+        devolve os subperíodos em que deve ser dividida.
+        Retorna (lista de páginas, subperíodos).
+        """
+        primeira = self.listar_contratacoes(d_ini, d_fim, 1, modalidade)
+        if not primeira or not primeira.get('data'):
+            return [], []
+        total_paginas = primeira.get('totalPaginas', 1)
+        if total_paginas > LIMITE_PAGINAS_PARTICAO and d_ini < d_fim:
+            partes = -(-total_paginas // LIMITE_PAGINAS_PARTICAO)
+            return [], self.dividir_periodo(d_ini, d_fim, partes)
+        
+        paginas = [primeira['data']]
+        restantes = self.executor_itens.map(
+            lambda p: self.listar_contratacoes(d_ini, d_fim, p, modalidade), range(2, total_paginas + 1))
+        # Uma página que falhou fica na fila de falhas; as seguintes são mantidas
+        for dados in restantes:
+            if not dados or not dados.get('data'): continue
+            paginas.append(dados['data'])
+        return paginas, []
+
+    def _listar_particao_completa(self, modalidade, d_ini, d_fim):
+        """Páginas de uma partição, já resolvendo as subdivisões (em série)."""
+        paginas, subperiodos = self.listar_particao(modalidade, d_ini, d_fim)
+        for s_ini, s_fim in subperiodos:
+            paginas.extend(self._listar_particao_completa(modalidade, s_ini, s_fim))
+        return paginas
+
+    def paginas_contratacoes(self, d_ini, d_fim, estado=None, compras_existentes=None):
+        """Estágio 1 do pipeline: lista as partições modalidade x período em paralelo.
+
+        As partições são planejadas de antemão e listadas concorrentemente
+        (até 2 x max_workers adiantadas), mas as páginas saem na ordem do
+        plano, com as contratações da página e as que ainda precisam ser
+        detalhadas (fora de `compras_existentes`). Partições grandes demais
+        são substituídas, no mesmo lugar da fila, pelos seus subperíodos.
+        O checkpoint aponta o início da partição em andamento: um run
+        retomado relista essa partição, e o que já foi gravado é descartado
+        por `compras_existentes`.
+        """
+        compras_existentes = compras_existentes if compras_existentes is not None else set()
+        pendentes = deque(self.planejar_particoes(d_ini, d_fim, estado))
+        em_voo = deque()
+        print(f"{len(pendentes)} partições planejadas (modalidade x período).")
+        
+        while pendentes or em_voo:
+            while pendentes and len(em_voo) < self.max_workers * 2:
+                particao = pendentes.popleft()
+                em_voo.append((particao, self.executor_listagem.submit(self.listar_particao, *particao)))
+            
+            (mod, p_ini, p_fim), futuro = em_voo.popleft()
+            with self.metricas.etapa("listagem"):
+                paginas, subperiodos = futuro.result()
+            if subperiodos:
+                print(f"  Modalidade {mod}, {p_ini} a {p_fim}: dividida em {len(subperiodos)} periodos")
+                filhos = [((mod, s_ini, s_fim), self.executor_listagem.submit(self.listar_particao, mod, s_ini, s_fim))
+                          for s_ini, s_fim in subperiodos]
+                em_voo.extendleft(reversed(filhos))
+                continue
+            if not paginas:
+                continue
             
-            for mod in modalidades:
-                pagina = 1
-                while True:
-                    dados = self.listar_contratacoes(s_ini, s_fim, pagina, mod)
-                    if not dados or 'data' not in dados or not dados['data']: break
-                    
-                    for contratacao in dados['data']:
-                        novos_itens = self.processar_contratacao_completa(contratacao)
-                        todos_resultados.extend(novos_itens)
-                    
-                    if pagina >= dados.get('totalPaginas', 1): break
-                    pagina += 1
-            atual = bloco_fim + timedelta(days=1)
+            print(f"\n--- Modalidade {mod}: {p_ini} a {p_fim} ({len(paginas)} paginas) ---")
+            for numero, contratacoes in enumerate(paginas, start=1):
+                novas = []
+                for contratacao in contratacoes:
+                    chave = self.chave_compra(contratacao)
+                    if chave not in compras_existentes:
+                        compras_existentes.add(chave)
+                        novas.append(contratacao)
+                yield {"janela": p_ini, "modalidade": mod, "pagina": numero,
+                       "contratacoes": contratacoes, "novas": novas}
+        print(f"Taxa efetiva: {self.limitador.taxa_efetiva:.2f} req/s")
+
+    def detalhar_por_compra(self, contratacoes):
+        """Lista de itens de cada compra, na ordem das compras (threads ou transporte assíncrono)."""
+        if self.transporte:
+            return self.transporte.executar(self.transporte.processar_compras(contratacoes))
+        return list(self.executor_compras.map(self.processar_contratacao_completa, contratacoes))
+
+    def detalhar_compras(self, contratacoes):
+        """Itens das compras, na ordem das compras."""
+        return [item for itens in self.detalhar_por_compra(contratacoes) for item in itens]
+
+    def detalhar_paginas(self, paginas):
+        """Estágios 2 a 4: itens, resultados e formatação das compras novas de cada página.
+
+        Só uma página fica em processamento por vez; a próxima só é listada
+        quando o consumidor pede, o que segura o estágio 1.
+        """
+        for pagina in paginas:
+            with self.metricas.etapa("detalhamento"):
+                itens = self.detalhar_compras(pagina['novas'])
+            self.metricas.contar("itens", len(itens))
+            pagina['itens'] = itens
+            yield pagina
+
+    def importar_em_fluxo(self, d_ini, d_fim, sink, estado=None, compras_existentes=None, tamanho_lote=500):
+        """Importa em fluxo, entregando os itens a `sink` em lotes de ~`tamanho_lote`.
+
+        O checkpoint (e as marcas d'água) só avança depois que o lote que
+        contém a página foi entregue ao sink, então um run interrompido perde
+        no máximo o lote em andamento. A memória usada não depende do período.
+        Retorna o total de itens entregues.
+        """
+        lote, paginas_no_lote = [], []
+        total_itens = 0
+        
+        def descarregar():
+            nonlocal lote, paginas_no_lote
+            if lote:
+                with self.metricas.etapa("gravacao"):
+                    sink(lote)
+            if estado and paginas_no_lote:
+                for p in paginas_no_lote:
+                    for contratacao in p['contratacoes']:
+                        estado.atualizar_marca(p['modalidade'], contratacao.get('dataPublicacaoPncp'))
+                ultima = paginas_no_lote[-1]
+                estado.registrar_pagina(ultima['janela'], ultima['modalidade'], ultima['pagina'] + 1)
+            lote, paginas_no_lote = [], []
+        
+        paginas = self.paginas_contratacoes(d_ini, d_fim, estado, compras_existentes)
+        for pagina in self.detalhar_paginas(paginas):
+            lote.extend(pagina['itens'])
+            total_itens += len(pagina['itens'])
+            paginas_no_lote.append({k: pagina[k] for k in ("janela", "modalidade", "pagina", "contratacoes")})
+            if len(lote) >= tamanho_lote or len(paginas_no_lote) >= 50:
+                descarregar()
+        descarregar()
+        return total_itens
+
+    def importar_tudo(self, d_ini, d_fim, estado=None, compras_existentes=None):
+        """Importa o período inteiro para uma lista em memória.
+
+        Para runs longos prefira importar_em_fluxo, que grava à medida que avança.
+        """
+        todos_resultados = []
+        self.importar_em_fluxo(d_ini, d_fim, todos_resultados.extend, estado, compras_existentes)
         return todos_resultados
 
+    def reprocessar_falhas(self, sink, compras_existentes=None, limite=None):
+        """Passada de baixa prioridade sobre a fila de falhas, para depois da varredura.
+
+        Uma falha com compra refaz a compra inteira (lista de itens truncada,
+        resultado que faltou...); uma falha de listagem repete a página e
+        detalha as compras ainda não gravadas. A falha sai da fila se não se
+        repetir. Retorna quantas falhas foram resolvidas.
+        """
+        if not self.falhas:
+            return 0
+        compras_existentes = compras_existentes if compras_existentes is not None else set()
+        antes = self.falhas.estatisticas()["total"]
+        pendentes = self.falhas.pendentes(limite)
+        if not pendentes:
+            return 0
+        print(f"Reprocessando {len(pendentes)} requisições da fila de falhas...")
+        inicio = datetime.now().isoformat()
+
+        for falha in (f for f in pendentes if not f['compra']):
+            params = falha['params'] or {}
+            if str(params.get('pagina', 1)) == "1" and 'codigoModalidadeContratacao' in params:
+                # Sem a primeira página a partição inteira ficou de fora
+                paginas = self._listar_particao_completa(
+                    int(params['codigoModalidadeContratacao']), params['dataInicial'], params['dataFinal'])
+            else:
+                dados = self._safe_request(falha['url'], falha['params'])
+                paginas = [(dados or {}).get('data') or []]
+            novas = []
+            for contratacao in (c for pagina in paginas for c in pagina):
+                chave = self.chave_compra(contratacao)
+                if chave not in compras_existentes:
+                    compras_existentes.add(chave)
+                    novas.append(contratacao)
+            itens = self.detalhar_compras(novas)
+            if itens:
+                sink(itens)
+            self.falhas.resolver(falha['url'], falha['params'], inicio)
+
+        # O detalhamento vai por detalhar_por_compra (no transporte assíncrono, se ligado)
+        compras = list(dict.fromkeys(f['compra'] for f in pendentes if f['compra']))
+        contratacoes = list(self.executor_compras.map(lambda c: self.obter_dados_contratacao(*c), compras))
+        detalhadas = iter(self.detalhar_por_compra([c for c in contratacoes if c]))
+        for compra, contratacao in zip(compras, contratacoes):
+            itens = next(detalhadas) if contratacao else []
+            if itens:
+                sink(itens)
+            self.falhas.resolver_compra(compra, inicio)
+        return max(0, antes - self.falhas.estatisticas()["total"])
+
+    def fechar(self):
+        self.executor_listagem.shutdown()
+        self.executor_compras.shutdown()
+        super().fechar()
+
 # --- LOGICA PRINCIPAL ---
 FILE_NAME = 'dados.json'
+RELATORIO_FILE = 'relatorio_importacao.json'
 
-def main():
-    dados_carregados = []
-    is_dict_format = False
-    full_json_data = {}
-
-    if os.path.exists(FILE_NAME):
-        with open(FILE_NAME, 'r', encoding='utf-8') as f:
-            try:
-                content = json.load(f)
-                if isinstance(content, list):
-                    dados_carregados = content
-                    is_dict_format = False
-                elif isinstance(content, dict):
-                    full_json_data = content
-                    dados_carregados = content.get('data', [])
-                    is_dict_format = True
-            except Exception as e:
-                print(f"Erro ao ler JSON: {e}")
+def sincronizar(args, metricas):
+    armazem = ArmazemItens()
+    semeados = armazem.semear_de_json(FILE_NAME)
+    if semeados:
+        print(f"Banco criado a partir do {FILE_NAME} ({semeados} registros).")
 
     # MODIFICAÇÃO: Busca dos últimos 360 dias
     data_hoje = datetime.now()
     data_inicio_busca = (data_hoje - timedelta(days=90)).strftime("%Y%m%d")
     data_fim_busca = data_hoje.strftime("%Y%m%d")
     
-    print(f"Iniciando sincronizacao de {data_inicio_busca} ate {data_fim_busca} (ultimos 90 dias)...")
-    importer = PNCPImporter()
-    novos_dados = importer.importar_tudo(data_inicio_busca, data_fim_busca)
-
-    if novos_dados:
-        # Remove duplicatas baseado em chave única (ano + compra + itemNo)
-        chaves_existentes = set()
-        for item in dados_carregados:
-            chave = f"{item.get('ano')}_{item.get('compra')}_{item.get('itemNo')}"
-            chaves_existentes.add(chave)
-        
-        novos_dados_unicos = []
-        for item in novos_dados:
-            chave = f"{item.get('ano')}_{item.get('compra')}_{item.get('itemNo')}"
-            if chave not in chaves_existentes:
-                novos_dados_unicos.append(item)
-                chaves_existentes.add(chave)
-        
-        if novos_dados_unicos:
-            if is_dict_format:
-                full_json_data['data'] = dados_carregados + novos_dados_unicos
-                full_json_data['totalRegistros'] = len(full_json_data['data'])
-                full_json_data['geradoEm'] = datetime.now().isoformat()
-                dados_finais = full_json_data
-            else:
-                dados_finais = dados_carregados + novos_dados_unicos
-                
-            with open(FILE_NAME, 'w', encoding='utf-8') as f:
-                json.dump(dados_finais, f, indent=4, ensure_ascii=False)
-            print(f"\nSucesso! {len(novos_dados_unicos)} novos registros adicionados.")
-        else:
-            print("\nNenhuma nova contratacao encontrada (todas ja existiam).")
+    estado = EstadoSync()
+    if estado.checkpoint and not args.so_falhas:
+        data_inicio_busca = estado.checkpoint['dataInicial']
+        print(f"Retomando run interrompido na modalidade {estado.checkpoint['modalidade']}, "
+              f"a partir de {estado.checkpoint['janela']}...")
+    
+    cache = CacheRespostas()
+    falhas = FilaFalhas()
+    importer = PNCPImporter(requisicoes_por_segundo=args.taxa, cache=cache, metricas=metricas, falhas=falhas,
+                            assincrono=args.assincrono)
+    alterados = 0
+    
+    def gravar_lote(itens):
+        nonlocal alterados
+        alterados += armazem.upsert(itens)
+        print(f"  >> Lote gravado ({len(itens)} itens).")
+    
+    if not args.so_falhas:
+        estado.iniciar_run(data_inicio_busca, data_fim_busca, incremental=not args.completo)
+        print(f"Iniciando sincronizacao de {data_inicio_busca} ate {data_fim_busca} (ultimos 90 dias)...")
+        importer.importar_em_fluxo(data_inicio_busca, data_fim_busca, gravar_lote, estado, armazem.chaves_compras())
+        estado.concluir()
+    
+    # Baixa prioridade: só depois da varredura, e limitado a --limite-falhas por run
+    resolvidas = importer.reprocessar_falhas(gravar_lote, armazem.chaves_compras(), args.limite_falhas)
+    print(f"Fila de falhas: {resolvidas} resolvidas, {falhas.estatisticas()}")
+    print(f"Cache HTTP: {cache.estatisticas()}")
+    metricas.anexar("cache", cache.estatisticas())
+    metricas.anexar("limitador", importer.limitador.estatisticas())
+    metricas.anexar("falhas", falhas.estatisticas())
+    importer.fechar()
+    cache.fechar()
+    falhas.fechar()
+
+    if alterados:
+        print(f"\nSucesso! {alterados} registros novos ou alterados (rode exportar_dados.py para gerar o {FILE_NAME}).")
     else:
         print("\nNenhuma nova contratacao encontrada.")
+    armazem.fechar()
+
+DESCRICAO = "Sincroniza contratações do PNCP com o banco de itens"
+
+def configurar_argumentos(parser):
+    parser.add_argument("--completo", action="store_true",
+                        help="Ignora a marca d'água e varre todos os últimos 90 dias")
+    parser.add_argument("--taxa", type=float, default=1.0, help="Requisições/s iniciais (ajustadas pelas respostas da API)")
+    parser.add_argument("--limite-falhas", type=int, default=200,
+                        help="Máximo de requisições da fila de falhas reprocessadas por run")
+    parser.add_argument("--async", dest="assincrono", action="store_true",
+                        help="Detalha as compras com o transporte assíncrono (aiohttp)")
+    parser.add_argument("--so-falhas", action="store_true", help="Só reprocessa a fila de falhas, sem varredura")
+    parser.add_argument("--relatorio", default=RELATORIO_FILE, help="JSON com as métricas do run, gravado ao sair")
+    parser.add_argument("--perfil", metavar="ARQUIVO", help="Roda sob o cProfile e grava as estatísticas em ARQUIVO")
+
+def executar(args):
+    executar_com_relatorio(lambda metricas: sincronizar(args, metricas), args.relatorio, args.perfil)
+
+def main():
+    parser = argparse.ArgumentParser(description=DESCRICAO)
+    configurar_argumentos(parser)
+    executar(parser.parse_args())
 
 if __name__ == "__main__":
     main()
-
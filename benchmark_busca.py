@@ -0,0 +1,71 @@
+"""Compara a latência da busca linear (como o index.html fazia) com o índice invertido.
+
+Uso: python benchmark_busca.py [--tamanhos 10000 100000 1000000] [--repeticoes 3]
+"""
+import argparse
+import random
+import time
+
+from indice_busca import CAMPOS_BUSCA, buscar, construir_indice, normalizar
+
+PALAVRAS = [
+    "aquisição", "contratação", "serviço", "manutenção", "material", "escritório",
+    "limpeza", "medicamento", "veículo", "combustível", "gênero", "alimentício",
+    "equipamento", "informática", "licença", "software", "construção", "reforma",
+    "pavimentação", "iluminação", "pública", "saúde", "educação", "merenda",
+    "papel", "caneta", "cadeira", "mesa", "computador", "impressora", "toner",
+]
+EMPRESAS = ["Comercial Silva LTDA", "Distribuidora Nordeste", "Tech Soluções ME", "Construtora Alagoas SA"]
+CONSULTAS = ["aquisição", "AQUISICAO", "manut", "material escritorio", "informática software", "xyz"]
+
+
+def gerar_registros(quantidade, semente=42):
+    aleatorio = random.Random(semente)
+    registros = []
+    for n in range(quantidade):
+        registros.append({
+            "compra": f"{n % 9000 + 1:05d}/{2020 + n % 6}",
+            "descricao": " ".join(aleatorio.choices(PALAVRAS, k=6)),
+            "objeto": " ".join(aleatorio.choices(PALAVRAS, k=8)),
+            "vencedor": aleatorio.choice(EMPRESAS),
+            "processo": f"PROC-{n % 5000}",
+        })
+    return registros
+
+
+def busca_linear(registros, consulta):
+    termo = normalizar(consulta)
+    return [i for i, item in enumerate(registros) if any(termo in normalizar(item.get(c)) for c in CAMPOS_BUSCA)]
+
+
+def medir(funcao, repeticoes):
+    melhor = float('inf')
+    for _ in range(repeticoes):
+        inicio = time.perf_counter()
+        funcao()
+        melhor = min(melhor, time.perf_counter() - inicio)
+    return melhor
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--tamanhos", type=int, nargs="+", default=[10_000, 100_000, 1_000_000])
+    parser.add_argument("--repeticoes", type=int, default=3)
+    args = parser.parse_args()
+
+    print(f"{'itens':>10} {'consulta':>22} {'linear (ms)':>12} {'indice (ms)':>12} {'resultados':>10}")
+    for tamanho in args.tamanhos:
+        registros = gerar_registros(tamanho)
+        inicio = time.perf_counter()
+        indice = construir_indice(registros)
+        construcao = time.perf_counter() - inicio
+        for consulta in CONSULTAS:
+            t_linear = medir(lambda: busca_linear(registros, consulta), 1 if tamanho >= 1_000_000 else args.repeticoes)
+            t_indice = medir(lambda: buscar(indice, consulta), args.repeticoes)
+            total = len(buscar(indice, consulta) or [])
+            print(f"{tamanho:>10} {consulta:>22} {t_linear * 1000:>12.1f} {t_indice * 1000:>12.2f} {total:>10}")
+        print(f"{tamanho:>10} {'(construcao do indice)':>22} {construcao * 1000:>12.1f}")
+
+
+if __name__ == "__main__":
+    main()
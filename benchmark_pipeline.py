@@ -0,0 +1,171 @@
+"""Benchmark de ponta a ponta do importador e do refresh contra o mock local da API.
+
+Cada cenário roda em um subprocesso (para o pico de RSS ser do cenário) com
+um servidor mock_pncp na mesma máquina, e reporta tempo total, requisições/s,
+itens/s e pico de RSS.
+
+Uso:
+    python benchmark_pipeline.py                          # tamanhos padrão
+    python benchmark_pipeline.py --salvar-baseline        # grava a referência
+    python benchmark_pipeline.py --baseline bench_baseline.json  # falha (exit 1) se regredir
+"""
+import argparse
+import contextlib
+import io
+import json
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+
+from mock_pncp import CNPJ_PADRAO, DadosSinteticos, MockPNCPServer
+
+DATA_INICIAL = "20250101"
+DATA_FINAL = "20250331"
+DIAS = 90
+BASELINE_FILE = 'bench_baseline.json'
+
+
+def _apontar_para(servidor, *classes):
+    for classe in classes:
+        classe.BASE_URL_CONSULTA = servidor.url
+        classe.BASE_URL_INTEGRACAO = servidor.url
+
+
+def _pico_rss_mb():
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def executar_importar(compras, latencia, taxa):
+    from automacao_pncp import PNCPImporter
+
+    dados = DadosSinteticos(compras=compras, data_inicial=DATA_INICIAL, dias=DIAS)
+    servidor = MockPNCPServer(capacidade=1e9, dados=dados, latencia=latencia).iniciar()
+    _apontar_para(servidor, PNCPImporter)
+    importer = PNCPImporter(cnpj=CNPJ_PADRAO, requisicoes_por_segundo=taxa)
+
+    inicio = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        itens = importer.importar_tudo(DATA_INICIAL, DATA_FINAL)
+    duracao = time.perf_counter() - inicio
+    servidor.shutdown()
+    return servidor, duracao, len(itens)
+
+
+def executar_refresh(compras, latencia, taxa):
+    import refresh_pncp
+    from armazenamento import ArmazemItens
+    from automacao_pncp import PNCPImporter
+
+    dados = DadosSinteticos(compras=compras, data_inicial=DATA_INICIAL, dias=DIAS)
+    servidor = MockPNCPServer(capacidade=1e9, dados=dados, latencia=latencia).iniciar()
+    _apontar_para(servidor, PNCPImporter, refresh_pncp.PNCPRefresher)
+
+    diretorio = tempfile.mkdtemp(prefix="bench_refresh_")
+    os.chdir(diretorio)
+    # Prepara o banco com uma importação (fora da medição) e avança o "tempo" do mock
+    with contextlib.redirect_stdout(io.StringIO()):
+        itens = PNCPImporter(cnpj=CNPJ_PADRAO, requisicoes_por_segundo=1e6).importar_tudo(DATA_INICIAL, DATA_FINAL)
+    armazem = ArmazemItens()
+    armazem.upsert(itens)
+    armazem.fechar()
+    dados.rodada = 1
+    servidor.total_requisicoes = servidor.total_bytes = servidor.total_429 = servidor.total_5xx = 0
+
+    sys.argv = ["refresh_pncp.py", "--taxa", str(taxa)]
+    inicio = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        refresh_pncp.main()
+    duracao = time.perf_counter() - inicio
+    servidor.shutdown()
+    return servidor, duracao, len(itens)
+
+
+CENARIOS = {"importar": executar_importar, "refresh": executar_refresh}
+
+
+def executar_cenario(cenario, compras, latencia, taxa):
+    servidor, duracao, itens = CENARIOS[cenario](compras, latencia, taxa)
+    return {
+        "cenario": cenario,
+        "compras": compras,
+        "itens": itens,
+        "requisicoes": servidor.total_requisicoes,
+        "respostas429": servidor.total_429,
+        "bytes": servidor.total_bytes,
+        "tempo_s": round(duracao, 3),
+        "requisicoes_s": round(servidor.total_requisicoes / duracao, 1) if duracao else 0,
+        "itens_s": round(itens / duracao, 1) if duracao else 0,
+        "pico_rss_mb": round(_pico_rss_mb(), 1),
+    }
+
+
+def rodar_em_subprocesso(cenario, compras, args):
+    comando = [sys.executable, os.path.abspath(__file__), "--executar", cenario, "--compras", str(compras),
+               "--latencia", str(args.latencia), "--taxa", str(args.taxa)]
+    saida = subprocess.run(comando, check=True, capture_output=True, text=True,
+                           cwd=os.path.dirname(os.path.abspath(__file__))).stdout
+    return json.loads(saida.strip().splitlines()[-1])
+
+
+def comparar(resultados, baseline, tolerancia):
+    """Lista as regressões de tempo ou de número de requisições acima da tolerância."""
+    regressoes = []
+    for r in resultados:
+        chave = f"{r['cenario']}:{r['compras']}"
+        referencia = baseline.get(chave)
+        if not referencia:
+            continue
+        for metrica in ("tempo_s", "requisicoes"):
+            limite = referencia[metrica] * (1 + tolerancia)
+            if r[metrica] > limite:
+                regressoes.append(f"{chave} {metrica}: {r[metrica]} > {limite:.2f} (referência {referencia[metrica]})")
+    return regressoes
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark do pipeline contra o mock local da API do PNCP")
+    parser.add_argument("--tamanhos", type=int, nargs="+", default=[20, 100, 400], help="Número de compras sintéticas")
+    parser.add_argument("--cenarios", nargs="+", default=list(CENARIOS), choices=list(CENARIOS))
+    parser.add_argument("--latencia", type=float, default=0.02, help="Latência simulada por requisição (s)")
+    parser.add_argument("--taxa", type=float, default=500.0, help="Requisições/s iniciais dos clientes")
+    parser.add_argument("--baseline", help="JSON de referência; sai com código 1 se houver regressão")
+    parser.add_argument("--tolerancia", type=float, default=0.25)
+    parser.add_argument("--salvar-baseline", action="store_true", help=f"Grava os resultados em {BASELINE_FILE}")
+    parser.add_argument("--executar", choices=list(CENARIOS), help=argparse.SUPPRESS)
+    parser.add_argument("--compras", type=int, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.executar:
+        print(json.dumps(executar_cenario(args.executar, args.compras, args.latencia, args.taxa)))
+        return
+
+    resultados = []
+    print(f"{'cenario':>9} {'compras':>7} {'itens':>6} {'reqs':>6} {'tempo(s)':>9} {'req/s':>8} {'itens/s':>8} {'RSS(MB)':>8}")
+    for cenario in args.cenarios:
+        for compras in args.tamanhos:
+            r = rodar_em_subprocesso(cenario, compras, args)
+            resultados.append(r)
+            print(f"{r['cenario']:>9} {r['compras']:>7} {r['itens']:>6} {r['requisicoes']:>6} {r['tempo_s']:>9.2f} "
+                  f"{r['requisicoes_s']:>8.1f} {r['itens_s']:>8.1f} {r['pico_rss_mb']:>8.1f}")
+
+    if args.salvar_baseline:
+        with open(BASELINE_FILE, 'w', encoding='utf-8') as f:
+            json.dump({f"{r['cenario']}:{r['compras']}": r for r in resultados}, f, indent=4)
+        print(f"Referência salva em {BASELINE_FILE}.")
+
+    if args.baseline:
+        with open(args.baseline, 'r', encoding='utf-8') as f:
+            regressoes = comparar(resultados, json.load(f), args.tolerancia)
+        if regressoes:
+            print("\nRegressões encontradas:")
+            for regressao in regressoes:
+                print(f"  - {regressao}")
+            sys.exit(1)
+        print("\nSem regressões em relação à referência.")
+
+
+if __name__ == "__main__":
+    main()
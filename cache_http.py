@@ -0,0 +1,136 @@
+import json
+import sqlite3
+import threading
+import time
+from collections import namedtuple
+from urllib.parse import urlencode
+
+CACHE_FILE = 'cache_pncp.sqlite'
+
+# TTL em segundos por tipo de endpoint; o primeiro padrão contido na URL vence.
+TTLS_PADRAO = [
+    ("/resultados", 24 * 3600),
+    ("/itens", 3 * 24 * 3600),
+    ("/contratacoes/publicacao", 6 * 3600),
+    ("/compras/", 24 * 3600),
+]
+TTL_DESCONHECIDO = 3600
+
+EntradaCache = namedtuple("EntradaCache", ["dados", "etag", "last_modified", "fresca"])
+
+
+class CacheRespostas:
+    """Cache persistente (SQLite) das respostas JSON da API, chaveado por URL + parâmetros.
+
+    Entradas vencidas continuam guardadas para revalidação condicional
+    (ETag/Last-Modified). Acima de `max_entradas`, as menos acessadas
+    recentemente são descartadas.
+    """
+
+    def __init__(self, caminho=CACHE_FILE, ttls=None, max_entradas=200_000):
+        self.caminho = caminho
+        self.ttls = ttls if ttls is not None else TTLS_PADRAO
+        self.max_entradas = max_entradas
+        self.hits = 0
+        self.misses = 0
+        self.revalidacoes = 0
+        self._escritas = 0
+        self._lock = threading.Lock()
+        self.conn = sqlite3.connect(caminho, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS respostas (
+                chave TEXT PRIMARY KEY,
+                corpo TEXT NOT NULL,
+                etag TEXT,
+                last_modified TEXT,
+                salvo_em REAL NOT NULL,
+                acessado_em REAL NOT NULL
+            )
+        """)
+        self.conn.execute("CREATE INDEX IF NOT EXISTS idx_respostas_acesso ON respostas (acessado_em)")
+        self.conn.commit()
+
+    @staticmethod
+    def chave(url, params=None):
+        if not params:
+            return url
+        return f"{url}?{urlencode(sorted(params.items()))}"
+
+    def ttl(self, url):
+        for padrao, segundos in self.ttls:
+            if padrao in url:
+                return segundos
+        return TTL_DESCONHECIDO
+
+    def buscar(self, url, params=None):
+        """Retorna a EntradaCache (fresca ou vencida) ou None se não houver."""
+        chave = self.chave(url, params)
+        agora = time.time()
+        with self._lock:
+            linha = self.conn.execute(
+                "SELECT corpo, etag, last_modified, salvo_em FROM respostas WHERE chave = ?", (chave,)
+            ).fetchone()
+            if linha is None:
+                self.misses += 1
+                return None
+            self.conn.execute("UPDATE respostas SET acessado_em = ? WHERE chave = ?", (agora, chave))
+            fresca = agora - linha[3] < self.ttl(url)
+            if fresca:
+                self.hits += 1
+            else:
+                self.misses += 1
+        return EntradaCache(json.loads(linha[0]), linha[1], linha[2], fresca)
+
+    def cabecalhos_condicionais(self, entrada):
+        headers = {}
+        if entrada is not None:
+            if entrada.etag:
+                headers["If-None-Match"] = entrada.etag
+            if entrada.last_modified:
+                headers["If-Modified-Since"] = entrada.last_modified
+        return headers
+
+    def salvar(self, url, params, dados, etag=None, last_modified=None):
+        chave = self.chave(url, params)
+        agora = time.time()
+        with self._lock:
+            self.conn.execute(
+                "INSERT OR REPLACE INTO respostas VALUES (?, ?, ?, ?, ?, ?)",
+                (chave, json.dumps(dados, ensure_ascii=False), etag, last_modified, agora, agora),
+            )
+            self._escritas += 1
+            if self._escritas % 500 == 0:
+                self._despejar()
+            self.conn.commit()
+
+    def renovar(self, url, params=None):
+        """Marca como fresca uma entrada confirmada por um 304 Not Modified."""
+        agora = time.time()
+        with self._lock:
+            self.revalidacoes += 1
+            self.hits += 1
+            self.conn.execute(
+                "UPDATE respostas SET salvo_em = ?, acessado_em = ? WHERE chave = ?",
+                (agora, agora, self.chave(url, params)),
+            )
+            self.conn.commit()
+
+    def _despejar(self):
+        total = self.conn.execute("SELECT COUNT(*) FROM respostas").fetchone()[0]
+        excedente = total - self.max_entradas
+        if excedente > 0:
+            self.conn.execute(
+                "DELETE FROM respostas WHERE chave IN "
+                "(SELECT chave FROM respostas ORDER BY acessado_em LIMIT ?)",
+                (excedente,),
+            )
+
+    def estatisticas(self):
+        return {"hits": self.hits, "misses": self.misses, "revalidacoes": self.revalidacoes}
+
+    def fechar(self):
+        with self._lock:
+            self._despejar()
+            self.conn.commit()
+            self.conn.close()
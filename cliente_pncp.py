@@ -0,0 +1,254 @@
+"""Cliente da API do PNCP compartilhado pelo importador e pelo refresh.
+
+Uma sessão requests, o cache HTTP, o limitador, as métricas e a fila de
+falhas ficam aqui; o PNCPImporter (automacao_pncp.py) acrescenta a
+listagem particionada e o pipeline, e o PNCPRefresher (refresh_pncp.py) a
+revalidação priorizada. Os registros são montados pelo modelo (modelo.Item).
+
+Com `assincrono=True` o detalhamento das compras usa o transporte aiohttp
+(transporte_async.py), que só cuida do I/O: URLs, cache, tratamento das
+respostas, fila de falhas e montagem dos itens são os deste cliente.
+"""
+import re
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+from instrumentacao import Metricas
+from limitador import LimitadorAdaptativo
+from modelo import Contratacao, Item
+from transporte_async import TransporteAssincrono
+
+TAMANHO_PAGINA_LISTAGEM = 50  # máximo aceito por /contratacoes/publicacao
+TAMANHO_PAGINA_ITENS = 100
+
+
+def limpar_cnpj(cnpj):
+    return re.sub(r'\D', '', str(cnpj))
+
+
+class ClientePNCP:
+    BASE_URL_CONSULTA = "https://pncp.gov.br/api/consulta"
+    BASE_URL_INTEGRACAO = "https://pncp.gov.br/api/pncp"
+    AGENTE = "Mozilla/5.0 (Windows NT 10.0; Win64; x64) Bot-Sincronizador-PNCP"
+
+    def __init__(self, cnpj="13650403000128", max_workers=8, requisicoes_por_segundo=1.0, max_tentativas=5, cache=None,
+                 limitador=None, metricas=None, falhas=None, assincrono=False):
+        self.cnpj = limpar_cnpj(cnpj)
+        self.cache = cache
+        self.falhas = falhas
+        self.metricas = metricas or Metricas()
+        self.max_workers = max_workers
+        self.max_tentativas = max_tentativas
+        self.requisicoes = 0
+        # Requisições que terminaram em falha (não em 200/204/304/404): como o
+        # _safe_request devolve None nos dois casos, quem precisa distinguir compara este contador.
+        self.requisicoes_falhas = 0
+        self.session = self.setup_session()
+        # Um único limitador para todas as threads: o orçamento da API é global.
+        # A taxa parte de requisicoes_por_segundo e se ajusta conforme 429/5xx.
+        # Vários clientes podem dividir um limitador (ver sync_orgaos.py).
+        self.limitador = limitador or LimitadorAdaptativo(taxa=requisicoes_por_segundo, capacidade=max_workers)
+        # Executor dos resultados dos itens e das páginas extras da listagem; suas tarefas nunca
+        # submetem outras, então pode ser usado a partir de outros executores.
+        self.executor_itens = ThreadPoolExecutor(max_workers=max_workers)
+        # Com assincrono=True o detalhamento das compras roda no transporte aiohttp
+        # (muitas requisições em voo numa só thread), no ritmo do mesmo limitador.
+        self.transporte = TransporteAssincrono(self) if assincrono else None
+
+    def setup_session(self):
+        session = requests.Session()
+        # 429/5xx são tratados em _safe_request pelo limitador adaptativo;
+        # o urllib3 só repete falhas de conexão.
+        retry_strategy = Retry(
+            total=5,
+            backoff_factor=1,
+            respect_retry_after_header=False,
+            allowed_methods=["GET"]
+        )
+        adapter = HTTPAdapter(max_retries=retry_strategy, pool_maxsize=self.max_workers * 2)
+        session.mount("https://", adapter)
+        session.headers.update({
+            "User-Agent": self.AGENTE,
+            "Accept": "application/json"
+        })
+        return session
+
+    def _registrar_falha(self, url, params, compra, motivo):
+        self.requisicoes_falhas += 1
+        if self.falhas:
+            self.falhas.registrar(url, params, compra, motivo)
+        else:
+            print(f"  [!] Aviso: {motivo} na URL: {url}")
+
+    # --- Partes comuns aos dois transportes ---
+
+    def _consultar_cache(self, url, params):
+        """Entrada do cache para a requisição (se fresca, é a resposta) e os cabeçalhos condicionais."""
+        entrada = self.cache.buscar(url, params) if self.cache else None
+        if entrada and entrada.fresca:
+            self.metricas.contar("cacheFresco")
+        headers = self.cache.cabecalhos_condicionais(entrada) if self.cache else None
+        return entrada, headers
+
+    def _tratar_resposta(self, url, params, compra, entrada, status, cabecalhos, dados, segundos, tamanho, tentativa):
+        """Registra uma resposta (métricas, limitador, cache, fila de falhas).
+
+        Retorna (concluída, dados); concluída é False se a requisição deve
+        ser repetida (429/5xx).
+        """
+        self.metricas.requisicao(url, status, segundos, tamanho, tentativa)
+        self.limitador.registrar_resposta(status, cabecalhos.get('Retry-After'))
+        if status == 304 and entrada:
+            self.cache.renovar(url, params)
+            return True, entrada.dados
+        if status == 200:
+            if self.cache:
+                self.cache.salvar(url, params, dados, cabecalhos.get('ETag'), cabecalhos.get('Last-Modified'))
+            return True, dados
+        if status in (204, 404):
+            return True, None
+        if status in LimitadorAdaptativo.STATUS_SOBRECARGA:
+            return False, None
+        self._registrar_falha(url, params, compra, f"HTTP {status}")
+        return True, None
+
+    def _tratar_erro(self, url, params, compra, erro):
+        self.metricas.erro(url, erro)
+        self._registrar_falha(url, params, compra, type(erro).__name__)
+        print(f"Erro na requisição: {erro}")
+
+    def _params_listagem(self, data_inicial, data_final, pagina, modalidade):
+        params = {
+            "dataInicial": data_inicial,
+            "dataFinal": data_final,
+            "pagina": pagina,
+            "tamanhoPagina": TAMANHO_PAGINA_LISTAGEM,
+            "cnpj": self.cnpj
+        }
+        if modalidade:
+            params["codigoModalidadeContratacao"] = modalidade
+        return params
+
+    def _url_compra(self, base, cnpj, ano, sequencial, sufixo=""):
+        """URL de uma compra (ou de `sufixo` dentro dela) e a chave (cnpj, ano, sequencial) usada na fila de falhas."""
+        compra = (limpar_cnpj(cnpj), ano, sequencial)
+        return f"{base}/v1/orgaos/{compra[0]}/compras/{ano}/{sequencial}{sufixo}", compra
+
+    @staticmethod
+    def _params_itens(pagina):
+        return {"pagina": pagina, "tamanhoPagina": TAMANHO_PAGINA_ITENS}
+
+    @staticmethod
+    def _lista_itens(dados):
+        """Itens de uma página de /itens (lista, envelope ou um item solto)."""
+        if not dados: return []
+
+        items_list = []
+        if isinstance(dados, list): items_list = dados
+        elif isinstance(dados, dict): items_list = dados.get('data') or dados.get('resultado') or []
+
+        if not items_list and isinstance(dados, dict) and 'numeroItem' in dados:
+            items_list = [dados]
+        return items_list
+
+    @staticmethod
+    def _pagina_incompleta(items_list):
+        return len(items_list) < TAMANHO_PAGINA_ITENS
+
+    @staticmethod
+    def _lista_resultados(resultados):
+        if isinstance(resultados, list): return resultados
+        if isinstance(resultados, dict): return [resultados]
+        return []
+
+    # --- Transporte síncrono ---
+
+    def _safe_request(self, url, params=None, compra=None):
+        """GET com cache, limitador e novas tentativas; None se vazio ou em falha.
+
+        Falhas (exceções, status inesperados, tentativas esgotadas) vão para
+        a fila de falhas, se houver, com a `compra` (cnpj, ano, sequencial) a
+        que pertencem.
+        """
+        entrada, headers = self._consultar_cache(url, params)
+        if entrada and entrada.fresca:
+            return entrada.dados
+
+        for tentativa in range(self.max_tentativas):
+            try:
+                inicio = time.perf_counter()
+                self.limitador.aguardar()
+                self.metricas.espera(time.perf_counter() - inicio)
+                self.requisicoes += 1
+                inicio = time.perf_counter()
+                response = self.session.get(url, params=params, headers=headers, timeout=30)
+                dados = None
+                if response.status_code == 200:
+                    with self.metricas.etapa("json"):
+                        dados = response.json()
+                concluida, dados = self._tratar_resposta(
+                    url, params, compra, entrada, response.status_code, response.headers, dados,
+                    time.perf_counter() - inicio, len(response.content), tentativa)
+                if concluida:
+                    return dados
+            except Exception as e:
+                self._tratar_erro(url, params, compra, e)
+                return None
+        self._registrar_falha(url, params, compra, "TentativasEsgotadas")
+        return None
+
+    def listar_contratacoes(self, data_inicial, data_final, pagina=1, modalidade=None):
+        url = f"{self.BASE_URL_CONSULTA}/v1/contratacoes/publicacao"
+        return self._safe_request(url, params=self._params_listagem(data_inicial, data_final, pagina, modalidade))
+
+    def obter_dados_contratacao(self, cnpj, ano, sequencial):
+        url, compra = self._url_compra(self.BASE_URL_CONSULTA, cnpj, ano, sequencial)
+        return self._safe_request(url, compra=compra)
+
+    def obter_item_especifico(self, cnpj, ano, sequencial, numero_item):
+        url, compra = self._url_compra(self.BASE_URL_INTEGRACAO, cnpj, ano, sequencial, f"/itens/{numero_item}")
+        return self._safe_request(url, compra=compra)
+
+    def _obter_pagina_itens(self, url, pagina, compra=None):
+        return self._lista_itens(self._safe_request(url, params=self._params_itens(pagina), compra=compra))
+
+    def obter_itens_contratacao(self, cnpj, ano, sequencial):
+        url, compra = self._url_compra(self.BASE_URL_INTEGRACAO, cnpj, ano, sequencial, "/itens")
+        # A API não informa o total de páginas: a próxima só é pedida se a anterior veio cheia
+        itens_completos, pagina = [], 1
+        while True:
+            items_list = self._obter_pagina_itens(url, pagina, compra)
+            itens_completos.extend(items_list)
+            if self._pagina_incompleta(items_list):
+                return itens_completos
+            pagina += 1
+
+    def obter_resultados_item(self, cnpj, ano, sequencial, numero_item):
+        url, compra = self._url_compra(self.BASE_URL_INTEGRACAO, cnpj, ano, sequencial, f"/itens/{numero_item}/resultados")
+        return self._lista_resultados(self._safe_request(url, compra=compra))
+
+    def montar_item(self, contratacao, item):
+        """Item tipado a partir do JSON de /itens (com 'resultados_vencedores', se buscados)."""
+        try:
+            with self.metricas.etapa("formatacao"):
+                return Item.da_api(contratacao, item, item.get('resultados_vencedores'))
+        except Exception as e:
+            print(f"Erro na formatação: {e}")
+            return None
+
+    def montar_itens(self, contratacao, itens):
+        """Itens de uma compra (JSON de /publicacao) já detalhados; um item malformado é descartado sozinho."""
+        # Os itens da compra compartilham a mesma Contratacao
+        compra = Contratacao.da_api(contratacao)
+        montados = (self.montar_item(compra, item) for item in itens)
+        return [item for item in montados if item]
+
+    def fechar(self):
+        self.executor_itens.shutdown()
+        self.session.close()
+        if self.transporte:
+            self.transporte.fechar()
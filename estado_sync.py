@@ -0,0 +1,76 @@
+import json
+import os
+
+STATE_FILE = 'estado_sync.json'
+
+
+class EstadoSync:
+    """Marca d'água por modalidade e checkpoint retomável da sincronização.
+
+    `marcas` guarda a maior `dataPublicacaoPncp` já vista por modalidade.
+    `checkpoint` aponta a partição da listagem em andamento (modalidade e data
+    de início, em `janela`); só avança depois que os itens das partições
+    anteriores foram gravados, então um run interrompido é retomado sem perder
+    o que já foi baixado.
+    """
+
+    def __init__(self, caminho=STATE_FILE):
+        self.caminho = caminho
+        self.marcas = {}
+        self.checkpoint = None
+        if os.path.exists(caminho):
+            with open(caminho, 'r', encoding='utf-8') as f:
+                content = json.load(f)
+            self.marcas = content.get('marcas', {})
+            self.checkpoint = content.get('checkpoint')
+
+    def salvar(self):
+        temporario = f"{self.caminho}.tmp"
+        with open(temporario, 'w', encoding='utf-8') as f:
+            json.dump({"marcas": self.marcas, "checkpoint": self.checkpoint}, f, indent=4, ensure_ascii=False)
+        os.replace(temporario, self.caminho)
+
+    def inicio_modalidade(self, modalidade):
+        """Data (YYYYMMDD) a partir da qual a modalidade ainda pode ter novidades."""
+        marca = self.marcas.get(str(modalidade))
+        if not marca:
+            return None
+        return marca[:10].replace('-', '')
+
+    def iniciar_run(self, d_ini, d_fim, incremental=True):
+        """Abre um checkpoint novo, ou devolve o do run interrompido a ser retomado."""
+        if self.checkpoint is None:
+            self.checkpoint = {
+                "dataInicial": d_ini,
+                "dataFinal": d_fim,
+                "incremental": incremental,
+                "versao": 2,
+                "janela": None,
+                "modalidade": None,
+                "pagina": 1,
+                "marcasRun": {},
+            }
+            self.salvar()
+        return self.checkpoint
+
+    def atualizar_marca(self, modalidade, data_publicacao):
+        """Acumula a marca do run; só passa a valer em concluir(), para que as
+        consultas de um run retomado sejam idênticas às do original."""
+        marcas_run = self.checkpoint["marcasRun"]
+        chave = str(modalidade)
+        if data_publicacao and data_publicacao > marcas_run.get(chave, ''):
+            marcas_run[chave] = data_publicacao
+
+    def registrar_pagina(self, janela, modalidade, proxima_pagina):
+        """Avança o checkpoint para depois de uma página já gravada."""
+        self.checkpoint.update({"janela": janela, "modalidade": modalidade, "pagina": proxima_pagina})
+        self.salvar()
+
+    def concluir(self):
+        """Encerra o run: promove as marcas e descarta o checkpoint."""
+        if self.checkpoint:
+            for chave, data in self.checkpoint["marcasRun"].items():
+                if data > self.marcas.get(chave, ''):
+                    self.marcas[chave] = data
+        self.checkpoint = None
+        self.salvar()
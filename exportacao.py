@@ -0,0 +1,149 @@
+"""Exportação compacta e fragmentada por ano para o index.html.
+
+Gera em `dados/`:
+- `manifest.json`: facetas pré-calculadas (anos, situações, modalidades), a
+  lista de fragmentos e os itens mais recentes, o suficiente para a primeira
+  tela sem baixar nenhum fragmento;
+- `ano-<ano>.json.gz`: os itens do ano em formato colunar, com as strings
+  repetidas (órgão, modalidade, objeto, vencedor...) codificadas em dicionário;
+- `busca-<ano>.json.gz`: o índice invertido da busca para o mesmo fragmento;
+- `deltas/<dia>.ndjson`: as mudanças registradas em cada dia (uma por linha),
+  para quem já tem os dados aplicar só o que mudou.
+"""
+import gzip
+import json
+import os
+from datetime import datetime, timedelta
+
+from indice_busca import construir_indice
+from modelo import CAMPOS_DATA, formatar_data_legada, registro_legado
+
+DIRETORIO_EXPORTACAO = 'dados'
+
+COLUNAS = [
+    "orgao", "ano", "compra", "modalidade", "objeto", "itemNo", "descricao",
+    "quantidade", "unidade", "valorUnitEstimado", "valorTotalEstimado",
+    "vencedor", "cnpjVencedor", "valorUnitHomologado", "valorTotalHomologado",
+    "qtdHomologada", "situacaoItem", "linkPNCP", "processo",
+    "dataPublicacao", "dataResultado",
+]
+
+# Colunas com muitas repetições: viram índices para uma lista de valores distintos.
+# Tupla, não conjunto: a ordem das chaves em "dicionarios" não pode depender do hash seed,
+# senão os bytes dos fragmentos mudam a cada run.
+COLUNAS_DICIONARIO = ("orgao", "modalidade", "objeto", "vencedor", "cnpjVencedor", "unidade", "situacaoItem", "processo")
+
+QUANTIDADE_RECENTES = 4
+DIAS_DELTAS = 30
+
+
+def codificar_colunar(registros):
+    valores = {coluna: [] for coluna in COLUNAS}
+    dicionarios = {coluna: [] for coluna in COLUNAS_DICIONARIO}
+    indices = {coluna: {} for coluna in COLUNAS_DICIONARIO}
+    for item in registros:
+        for coluna in COLUNAS:
+            valor = item.get(coluna)
+            if coluna in COLUNAS_DICIONARIO:
+                indice = indices[coluna].get(valor)
+                if indice is None:
+                    indice = indices[coluna][valor] = len(dicionarios[coluna])
+                    dicionarios[coluna].append(valor)
+                valor = indice
+            valores[coluna].append(valor)
+    return {
+        "total": len(registros),
+        "colunas": COLUNAS,
+        "dicionarios": dicionarios,
+        "valores": valores,
+    }
+
+
+def gravar_gzip(caminho, conteudo):
+    """Grava JSON gzip de forma determinística (mtime=0): sem mudança nos dados, sem diff no git."""
+    dados = json.dumps(conteudo, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+    temporario = f"{caminho}.tmp"
+    with open(temporario, 'wb') as bruto:
+        with gzip.GzipFile(filename='', mode='wb', fileobj=bruto, compresslevel=9, mtime=0) as f:
+            f.write(dados)
+    os.replace(temporario, caminho)
+    return len(dados)
+
+
+def _mudanca_legada(mudanca):
+    if mudanca["campo"] == "*":
+        mudanca["novo"] = registro_legado(mudanca["novo"])
+    elif mudanca["campo"] in CAMPOS_DATA:
+        mudanca["anterior"] = formatar_data_legada(mudanca["anterior"])
+        mudanca["novo"] = formatar_data_legada(mudanca["novo"])
+    return mudanca
+
+
+def exportar_deltas(armazem, diretorio=DIRETORIO_EXPORTACAO, dias=DIAS_DELTAS):
+    """Grava um NDJSON por dia com as mudanças dos últimos `dias` dias e remove os mais antigos."""
+    pasta = os.path.join(diretorio, "deltas")
+    os.makedirs(pasta, exist_ok=True)
+    desde = (datetime.now() - timedelta(days=dias)).strftime("%Y-%m-%d")
+    deltas = []
+    for dia, mudancas in armazem.mudancas_por_dia(desde).items():
+        arquivo = f"{dia}.ndjson"
+        temporario = os.path.join(pasta, f"{arquivo}.tmp")
+        with open(temporario, 'w', encoding='utf-8') as f:
+            for mudanca in mudancas:
+                f.write(json.dumps(_mudanca_legada(mudanca), ensure_ascii=False, separators=(',', ':')) + "\n")
+        os.replace(temporario, os.path.join(pasta, arquivo))
+        deltas.append({"dia": dia, "arquivo": f"deltas/{arquivo}", "total": len(mudancas)})
+
+    ativos = {os.path.basename(d["arquivo"]) for d in deltas}
+    for nome in os.listdir(pasta):
+        if nome.endswith(".ndjson") and nome not in ativos:
+            os.remove(os.path.join(pasta, nome))
+    return sorted(deltas, key=lambda d: d["dia"], reverse=True)
+
+
+def exportar_fragmentos(armazem, diretorio=DIRETORIO_EXPORTACAO):
+    os.makedirs(diretorio, exist_ok=True)
+    anos, situacoes, modalidades = set(), set(), set()
+    fragmentos = []
+
+    for ano in armazem.anos():
+        registros = [registro_legado(item) for item in armazem.iterar(ano)]
+        for item in registros:
+            if item.get('ano'): anos.add(item['ano'])
+            if item.get('situacaoItem'): situacoes.add(item['situacaoItem'])
+            if item.get('modalidade'): modalidades.add(item['modalidade'])
+        arquivo = f"ano-{ano}.json.gz"
+        tamanho = gravar_gzip(os.path.join(diretorio, arquivo), codificar_colunar(registros))
+        arquivo_busca = f"busca-{ano}.json.gz"
+        gravar_gzip(os.path.join(diretorio, arquivo_busca), construir_indice(registros))
+        fragmentos.append({
+            "ano": ano,
+            "arquivo": arquivo,
+            "indiceBusca": arquivo_busca,
+            "total": len(registros),
+            "bytesDescomprimidos": tamanho,
+        })
+
+    # Remove fragmentos de anos que não existem mais
+    ativos = {f["arquivo"] for f in fragmentos} | {f["indiceBusca"] for f in fragmentos}
+    for nome in os.listdir(diretorio):
+        if nome.startswith(("ano-", "busca-")) and nome.endswith(".json.gz") and nome not in ativos:
+            os.remove(os.path.join(diretorio, nome))
+
+    manifest = {
+        "geradoEm": armazem.ultima_atualizacao(),
+        "totalRegistros": sum(f["total"] for f in fragmentos),
+        "facetas": {
+            "anos": sorted(anos, key=lambda a: int(a), reverse=True),
+            "situacoes": sorted(situacoes),
+            "modalidades": sorted(modalidades),
+        },
+        "fragmentos": sorted(fragmentos, key=lambda f: int(f["ano"]), reverse=True),
+        "recentes": [registro_legado(item) for item in armazem.ultimos(QUANTIDADE_RECENTES)],
+        "deltas": exportar_deltas(armazem, diretorio),
+    }
+    temporario = os.path.join(diretorio, "manifest.json.tmp")
+    with open(temporario, 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, ensure_ascii=False, indent=1)
+    os.replace(temporario, os.path.join(diretorio, "manifest.json"))
+    return manifest
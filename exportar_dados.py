@@ -0,0 +1,33 @@
+import argparse
+
+from analise import RESUMO_FILE, exportar_resumo
+from armazenamento import ArmazemItens, DB_FILE
+from exportacao import DIRETORIO_EXPORTACAO, exportar_fragmentos
+
+FILE_NAME = 'dados.json'
+
+DESCRICAO = "Exporta o banco de itens para os arquivos lidos pelo index.html"
+
+def configurar_argumentos(parser):
+    parser.add_argument("--banco", default=DB_FILE)
+    parser.add_argument("--saida", default=FILE_NAME, help="dados.json completo (formato legado)")
+    parser.add_argument("--diretorio", default=DIRETORIO_EXPORTACAO, help="Destino do manifest e dos fragmentos por ano")
+
+def executar(args):
+    armazem = ArmazemItens(args.banco)
+    armazem.semear_de_json(args.saida)
+    total = armazem.exportar_json(args.saida)
+    print(f"{args.saida} gerado com {total} registros.")
+    manifest = exportar_fragmentos(armazem, args.diretorio)
+    print(f"{args.diretorio}/manifest.json gerado com {len(manifest['fragmentos'])} fragmentos.")
+    exportar_resumo(armazem, args.diretorio)
+    print(f"{args.diretorio}/{RESUMO_FILE} gerado.")
+    armazem.fechar()
+
+def main():
+    parser = argparse.ArgumentParser(description=DESCRICAO)
+    configurar_argumentos(parser)
+    executar(parser.parse_args())
+
+if __name__ == "__main__":
+    main()
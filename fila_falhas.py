@@ -0,0 +1,102 @@
+"""Fila persistente (dead-letter) das requisições que falharam na importação.
+
+Cada falha guarda URL, parâmetros, a compra a que pertence (se houver) e o
+motivo (classe da exceção, status HTTP ou tentativas esgotadas). Uma
+passada de reprocessamento de baixa prioridade refaz só o que falhou: a
+compra inteira, quando a falha tem compra, ou a página de listagem.
+"""
+import json
+import sqlite3
+import threading
+from datetime import datetime
+
+from cache_http import CacheRespostas
+
+FALHAS_FILE = 'falhas_pncp.sqlite'
+MAX_TENTATIVAS_FILA = 10  # acima disso a falha fica guardada, mas sai do reprocessamento
+
+
+class FilaFalhas:
+    def __init__(self, caminho=FALHAS_FILE):
+        self.caminho = caminho
+        self._lock = threading.Lock()
+        self.conn = sqlite3.connect(caminho, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS falhas (
+                chave TEXT PRIMARY KEY,
+                url TEXT NOT NULL,
+                params TEXT,
+                cnpj TEXT,
+                ano TEXT,
+                sequencial TEXT,
+                motivo TEXT NOT NULL,
+                tentativas INTEGER NOT NULL DEFAULT 1,
+                primeira_falha TEXT NOT NULL,
+                ultima_falha TEXT NOT NULL
+            )
+        """)
+        self.conn.execute("CREATE INDEX IF NOT EXISTS idx_falhas_compra ON falhas (cnpj, ano, sequencial)")
+        self.conn.commit()
+
+    def registrar(self, url, params=None, compra=None, motivo="erro"):
+        """Registra (ou conta mais uma tentativa de) uma requisição que falhou; `compra` é (cnpj, ano, sequencial)."""
+        agora = datetime.now().isoformat()
+        cnpj, ano, sequencial = (str(parte) for parte in compra) if compra else (None, None, None)
+        with self._lock:
+            self.conn.execute("""
+                INSERT INTO falhas (chave, url, params, cnpj, ano, sequencial, motivo, primeira_falha, ultima_falha)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+                ON CONFLICT (chave) DO UPDATE SET
+                    motivo = excluded.motivo,
+                    tentativas = tentativas + 1,
+                    ultima_falha = excluded.ultima_falha
+            """, (CacheRespostas.chave(url, params), url, json.dumps(params) if params else None,
+                  cnpj, ano, sequencial, motivo, agora, agora))
+            self.conn.commit()
+
+    def pendentes(self, limite=None):
+        """Falhas a reprocessar, das menos tentadas e mais antigas para as demais."""
+        with self._lock:
+            cursor = self.conn.execute("""
+                SELECT url, params, cnpj, ano, sequencial, motivo, tentativas, ultima_falha FROM falhas
+                WHERE tentativas < ? ORDER BY tentativas, ultima_falha LIMIT ?
+            """, (MAX_TENTATIVAS_FILA, -1 if limite is None else limite))
+            return [
+                {
+                    "url": url,
+                    "params": json.loads(params) if params else None,
+                    "compra": (cnpj, ano, sequencial) if cnpj else None,
+                    "motivo": motivo,
+                    "tentativas": tentativas,
+                    "ultimaFalha": ultima,
+                }
+                for url, params, cnpj, ano, sequencial, motivo, tentativas, ultima in cursor
+            ]
+
+    def resolver(self, url, params=None, ate=None):
+        """Remove a falha se ela não se repetiu depois de `ate` (ISO)."""
+        with self._lock:
+            self.conn.execute("DELETE FROM falhas WHERE chave = ? AND ultima_falha < ?",
+                              (CacheRespostas.chave(url, params), ate or "9999"))
+            self.conn.commit()
+
+    def resolver_compra(self, compra, ate):
+        """Remove as falhas da compra que não se repetiram depois de `ate` (ISO)."""
+        with self._lock:
+            self.conn.execute("DELETE FROM falhas WHERE cnpj = ? AND ano = ? AND sequencial = ? AND ultima_falha < ?",
+                              tuple(str(parte) for parte in compra) + (ate,))
+            self.conn.commit()
+
+    def estatisticas(self):
+        with self._lock:
+            total, abandonadas = self.conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(tentativas >= ?), 0) FROM falhas", (MAX_TENTATIVAS_FILA,)
+            ).fetchone()
+            motivos = dict(self.conn.execute("SELECT motivo, COUNT(*) FROM falhas GROUP BY motivo"))
+        return {"total": total, "abandonadas": abandonadas, "motivos": motivos}
+
+    def fechar(self):
+        with self._lock:
+            self.conn.commit()
+            self.conn.close()
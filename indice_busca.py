@@ -0,0 +1,73 @@
+"""Índice invertido para a busca do index.html, gerado na exportação.
+
+Termos são normalizados como no front end (minúsculas, sem acentos), então
+"aquisição" e "AQUISICAO" caem no mesmo termo. A lista de termos é ordenada
+para permitir busca por prefixo com pesquisa binária; cada posting guarda as
+posições dos itens no fragmento, codificadas em delta.
+"""
+import bisect
+import re
+import unicodedata
+
+CAMPOS_BUSCA = ("compra", "descricao", "objeto", "vencedor", "processo")
+
+_TOKEN = re.compile(r'[a-z0-9]+')
+
+
+def normalizar(texto):
+    if not texto:
+        return ''
+    decomposto = unicodedata.normalize('NFD', str(texto).lower())
+    return ''.join(c for c in decomposto if not unicodedata.combining(c))
+
+
+def tokens(texto):
+    return _TOKEN.findall(normalizar(texto))
+
+
+def construir_indice(registros, campos=CAMPOS_BUSCA):
+    postings = {}
+    for posicao, item in enumerate(registros):
+        vistos = set()
+        for campo in campos:
+            vistos.update(tokens(item.get(campo)))
+        for termo in vistos:
+            postings.setdefault(termo, []).append(posicao)
+
+    termos = sorted(postings)
+    codificados = []
+    for termo in termos:
+        anterior = 0
+        deltas = []
+        for posicao in postings[termo]:
+            deltas.append(posicao - anterior)
+            anterior = posicao
+        codificados.append(deltas)
+    return {"campos": list(campos), "termos": termos, "postings": codificados}
+
+
+def _posicoes(deltas):
+    atual = 0
+    for delta in deltas:
+        atual += delta
+        yield atual
+
+
+def buscar(indice, consulta):
+    """Posições que contêm todos os termos da consulta (cada um como prefixo)."""
+    termos_consulta = tokens(consulta)
+    if not termos_consulta:
+        return None
+    termos = indice["termos"]
+    resultado = None
+    for prefixo in termos_consulta:
+        encontrados = set()
+        inicio = bisect.bisect_left(termos, prefixo)
+        for k in range(inicio, len(termos)):
+            if not termos[k].startswith(prefixo):
+                break
+            encontrados.update(_posicoes(indice["postings"][k]))
+        resultado = encontrados if resultado is None else resultado & encontrados
+        if not resultado:
+            return []
+    return sorted(resultado)
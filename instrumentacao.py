@@ -0,0 +1,198 @@
+"""Métricas dos runs de sincronização: requisições, etapas e relatório JSON.
+
+`Metricas` é compartilhada pelas threads de um run e acumula, por endpoint,
+um histograma de latência, status, tentativas extras, erros por classe e
+bytes recebidos; além do tempo esperando o limitador, o tempo por etapa do
+pipeline e contadores (itens, acertos do cache...). Tempos de espera, rede e
+etapas são somados entre as threads, então podem passar da duração do run.
+
+`executar_com_perfil` liga o cProfile em volta de uma função (só a thread
+principal é perfilada) e `executar_com_relatorio` roda um comando inteiro
+com as suas métricas, gravando o relatório mesmo se ele falhar.
+"""
+import cProfile
+import json
+import os
+import pstats
+import threading
+import time
+from bisect import bisect_left
+from collections import Counter
+from contextlib import contextmanager
+from datetime import datetime
+
+LIMITES_LATENCIA_MS = (10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000)
+
+# O primeiro padrão contido na URL dá o nome do endpoint (mesma ordem do cache_http)
+ENDPOINTS = [
+    ("/resultados", "resultados"),
+    ("/itens", "itens"),
+    ("/contratacoes/publicacao", "contratacoes"),
+    ("/compras/", "compra"),
+]
+
+
+def nome_endpoint(url):
+    for padrao, nome in ENDPOINTS:
+        if padrao in url:
+            return nome
+    return "outros"
+
+
+class Histograma:
+    """Histograma de latências em baldes fixos (LIMITES_LATENCIA_MS)."""
+
+    def __init__(self):
+        self.contagens = [0] * (len(LIMITES_LATENCIA_MS) + 1)
+        self.total = 0
+        self.soma_ms = 0.0
+        self.maximo_ms = 0.0
+
+    def registrar(self, ms):
+        self.contagens[bisect_left(LIMITES_LATENCIA_MS, ms)] += 1
+        self.total += 1
+        self.soma_ms += ms
+        self.maximo_ms = max(self.maximo_ms, ms)
+
+    def quantil(self, q):
+        """Limite superior do balde que contém o quantil q, sem passar do máximo observado."""
+        alvo = q * self.total
+        acumulado = 0
+        for indice, contagem in enumerate(self.contagens):
+            acumulado += contagem
+            if contagem and acumulado >= alvo:
+                limite = LIMITES_LATENCIA_MS[indice] if indice < len(LIMITES_LATENCIA_MS) else self.maximo_ms
+                return round(min(limite, self.maximo_ms), 1)
+        return 0
+
+    def resumo(self):
+        rotulos = [f"<={limite}" for limite in LIMITES_LATENCIA_MS] + [f">{LIMITES_LATENCIA_MS[-1]}"]
+        return {
+            "total": self.total,
+            "media_ms": round(self.soma_ms / self.total, 1) if self.total else 0,
+            "p50_ms": self.quantil(0.5),
+            "p95_ms": self.quantil(0.95),
+            "p99_ms": self.quantil(0.99),
+            "max_ms": round(self.maximo_ms, 1),
+            "baldes_ms": dict(zip(rotulos, self.contagens)),
+        }
+
+
+class Metricas:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._inicio = time.perf_counter()
+        self.iniciado_em = datetime.now().isoformat()
+        self.endpoints = {}
+        self.espera_s = 0.0
+        self.rede_s = 0.0
+        self.etapas = Counter()
+        self.contadores = Counter()
+        self.anexos = {}
+
+    def _endpoint(self, url):
+        nome = nome_endpoint(url)
+        if nome not in self.endpoints:
+            self.endpoints[nome] = {"latencia": Histograma(), "status": Counter(), "erros": Counter(),
+                                    "tentativasExtras": 0, "bytes": 0}
+        return self.endpoints[nome]
+
+    def requisicao(self, url, status, segundos, tamanho, tentativa=0):
+        with self._lock:
+            endpoint = self._endpoint(url)
+            endpoint["latencia"].registrar(segundos * 1000)
+            endpoint["status"][str(status)] += 1
+            endpoint["bytes"] += tamanho
+            if tentativa:
+                endpoint["tentativasExtras"] += 1
+            self.rede_s += segundos
+
+    def erro(self, url, excecao):
+        with self._lock:
+            self._endpoint(url)["erros"][type(excecao).__name__] += 1
+
+    def espera(self, segundos):
+        with self._lock:
+            self.espera_s += segundos
+
+    def contar(self, nome, quantidade=1):
+        with self._lock:
+            self.contadores[nome] += quantidade
+
+    @contextmanager
+    def etapa(self, nome):
+        inicio = time.perf_counter()
+        try:
+            yield
+        finally:
+            duracao = time.perf_counter() - inicio
+            with self._lock:
+                self.etapas[nome] += duracao
+
+    def anexar(self, nome, valor):
+        """Inclui no relatório um dado extra (estatísticas do cache, do limitador...)."""
+        self.anexos[nome] = valor
+
+    def relatorio(self):
+        duracao = time.perf_counter() - self._inicio
+        with self._lock:
+            endpoints = {
+                nome: {
+                    "requisicoes": e["latencia"].total,
+                    "latencia": e["latencia"].resumo(),
+                    "status": dict(e["status"]),
+                    "respostas429": e["status"].get("429", 0),
+                    "tentativasExtras": e["tentativasExtras"],
+                    "erros": dict(e["erros"]),
+                    "bytes": e["bytes"],
+                }
+                for nome, e in sorted(self.endpoints.items())
+            }
+            itens = self.contadores.get("itens", 0)
+            return {
+                "iniciadoEm": self.iniciado_em,
+                "duracao_s": round(duracao, 3),
+                "requisicoes": sum(e["requisicoes"] for e in endpoints.values()),
+                "bytes": sum(e["bytes"] for e in endpoints.values()),
+                "itens": itens,
+                "itens_s": round(itens / duracao, 2) if duracao else 0,
+                "tempo_s": {
+                    "esperaLimitador": round(self.espera_s, 3),
+                    "rede": round(self.rede_s, 3),
+                    "etapas": {nome: round(s, 3) for nome, s in sorted(self.etapas.items())},
+                },
+                "contadores": dict(self.contadores),
+                "endpoints": endpoints,
+                **self.anexos,
+            }
+
+    def gravar(self, caminho):
+        temporario = f"{caminho}.tmp"
+        with open(temporario, 'w', encoding='utf-8') as f:
+            json.dump(self.relatorio(), f, ensure_ascii=False, indent=2)
+        os.replace(temporario, caminho)
+
+
+def executar_com_perfil(funcao, caminho, linhas=25):
+    """Roda `funcao` sob o cProfile, grava as estatísticas em `caminho` e imprime as mais caras."""
+    perfil = cProfile.Profile()
+    perfil.enable()
+    try:
+        return funcao()
+    finally:
+        perfil.disable()
+        perfil.dump_stats(caminho)
+        print(f"\nPerfil gravado em {caminho} (abra com python -m pstats {caminho}):")
+        pstats.Stats(perfil).sort_stats("cumulative").print_stats(linhas)
+
+
+def executar_com_relatorio(funcao, relatorio, perfil=None):
+    """Roda `funcao(metricas)` (sob o cProfile, se `perfil`) e grava o relatório do run em `relatorio`."""
+    metricas = Metricas()
+    try:
+        if perfil:
+            return executar_com_perfil(lambda: funcao(metricas), perfil)
+        return funcao(metricas)
+    finally:
+        metricas.gravar(relatorio)
+        print(f"Relatório do run em {relatorio}.")
@@ -0,0 +1,228 @@
+import asyncio
+import heapq
+import threading
+import time
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+
+TAXA_COOLDOWN = 1.0  # o antigo intervalo fixo de 1 s entre requisições
+
+
+class LimitadorTaxa:
+    """Token bucket thread-safe compartilhado por todas as threads de um cliente.
+
+    Cada requisição consome uma ficha; as fichas são repostas continuamente à
+    taxa `taxa` (requisições/segundo) até o limite `capacidade` (rajada máxima).
+    """
+
+    def __init__(self, taxa=1.0, capacidade=1):
+        self.taxa = float(taxa)
+        self.capacidade = float(capacidade)
+        self._fichas = float(capacidade)
+        self._ultimo = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _repor(self, agora):
+        decorrido = agora - self._ultimo
+        if decorrido <= 0:
+            return
+        self._ultimo = agora
+        self._fichas = min(self.capacidade, self._fichas + decorrido * self.taxa)
+
+    def tentar_consumir(self):
+        """Consome uma ficha se houver; não bloqueia."""
+        with self._lock:
+            self._repor(time.monotonic())
+            if self._fichas >= 1:
+                self._fichas -= 1
+                return True
+            return False
+
+    def _consumir_ou_esperar(self):
+        """Consome uma ficha e retorna 0, ou retorna quantos segundos faltam para a próxima."""
+        with self._lock:
+            self._repor(time.monotonic())
+            if self._fichas >= 1:
+                self._fichas -= 1
+                return 0
+            return (1 - self._fichas) / self.taxa
+
+    def aguardar(self):
+        """Bloqueia até haver uma ficha disponível e a consome."""
+        while espera := self._consumir_ou_esperar():
+            time.sleep(espera)
+
+    async def aguardar_async(self):
+        """Como aguardar(), mas cede o event loop enquanto espera."""
+        while espera := self._consumir_ou_esperar():
+            await asyncio.sleep(espera)
+
+
+class LimitadorAdaptativo(LimitadorTaxa):
+    """Token bucket cuja taxa se ajusta às respostas da API (AIMD).
+
+    Respostas saudáveis aumentam a taxa em `passo` a cada `janela_sucessos`
+    requisições, até `taxa_max`. Um 429 multiplica a taxa por `fator_recuo`
+    (mínimo `taxa_min`) e, havendo `Retry-After`, suspende todas as threads
+    até o prazo indicado. Um 5xx recua mais devagar (`fator_recuo_5xx`) e
+    nunca abaixo de `taxa_min_5xx` (por padrão a menor entre a taxa inicial
+    e o antigo cooldown), já que não indica excesso de requisições.
+
+    Há no máximo um recuo por janela de `max(1/taxa, janela_recuo)`
+    segundos: as respostas das requisições que já estavam em voo quando a
+    API reclamou não cortam a taxa de novo.
+    """
+
+    STATUS_SOBRECARGA = (429, 500, 502, 503, 504)
+
+    def __init__(self, taxa=1.0, capacidade=1, taxa_min=0.1, taxa_max=10.0,
+                 passo=0.1, fator_recuo=0.5, janela_sucessos=10,
+                 fator_recuo_5xx=0.9, taxa_min_5xx=None, janela_recuo=1.0):
+        super().__init__(taxa=taxa, capacidade=capacidade)
+        self.taxa_min = taxa_min
+        self.taxa_max = max(taxa_max, taxa)
+        self.passo = passo
+        self.fator_recuo = fator_recuo
+        self.fator_recuo_5xx = fator_recuo_5xx
+        self.taxa_min_5xx = min(taxa, TAXA_COOLDOWN) if taxa_min_5xx is None else taxa_min_5xx
+        self.janela_recuo = janela_recuo
+        self.janela_sucessos = janela_sucessos
+        self._sucessos = 0
+        self._pausa_ate = 0.0
+        self._recuo_ate = 0.0
+        self._recuo_429_ate = 0.0
+        self.total_sucessos = 0
+        self.total_recuos = 0
+
+    @property
+    def taxa_efetiva(self):
+        """Taxa corrente em requisições/segundo."""
+        return self.taxa
+
+    def _pausa_restante(self):
+        with self._lock:
+            return max(0.0, self._pausa_ate - time.monotonic())
+
+    def aguardar(self):
+        while pausa := self._pausa_restante():
+            time.sleep(pausa)
+        super().aguardar()
+
+    async def aguardar_async(self):
+        while pausa := self._pausa_restante():
+            await asyncio.sleep(pausa)
+        await super().aguardar_async()
+
+    def registrar_resposta(self, status, retry_after=None):
+        """Informa o resultado de uma requisição para ajustar a taxa."""
+        with self._lock:
+            agora = time.monotonic()
+            if status in self.STATUS_SOBRECARGA:
+                self._sucessos = 0
+                # Um 429 ainda corta depois de um recuo por 5xx na mesma janela
+                if agora >= (self._recuo_429_ate if status == 429 else self._recuo_ate):
+                    self._repor(agora)
+                    if status == 429:
+                        self.taxa = max(self.taxa_min, self.taxa * self.fator_recuo)
+                    else:
+                        self.taxa = max(min(self.taxa, self.taxa_min_5xx), self.taxa * self.fator_recuo_5xx)
+                    self._recuo_ate = agora + max(1 / self.taxa, self.janela_recuo)
+                    if status == 429:
+                        self._recuo_429_ate = self._recuo_ate
+                    self.total_recuos += 1
+                espera = interpretar_retry_after(retry_after)
+                if espera:
+                    self._pausa_ate = max(self._pausa_ate, agora + espera)
+                    # Evita a rajada acumulada logo após a pausa
+                    self._fichas = 0.0
+                    self._ultimo = self._pausa_ate
+            else:
+                self.total_sucessos += 1
+                self._sucessos += 1
+                if self._sucessos >= self.janela_sucessos:
+                    self._repor(agora)
+                    self.taxa = min(self.taxa_max, self.taxa + self.passo)
+                    self._sucessos = 0
+
+    def estatisticas(self):
+        return {
+            "taxa_efetiva": round(self.taxa, 3),
+            "sucessos": self.total_sucessos,
+            "recuos": self.total_recuos,
+        }
+
+
+def interpretar_retry_after(valor):
+    """Converte o cabeçalho Retry-After (segundos ou data HTTP) em segundos."""
+    if not valor:
+        return 0.0
+    try:
+        return max(0.0, float(valor))
+    except ValueError:
+        pass
+    try:
+        prazo = parsedate_to_datetime(valor)
+        return max(0.0, (prazo - datetime.now(timezone.utc)).total_seconds())
+    except (TypeError, ValueError):
+        return 0.0
+
+
+class OrcamentoCompartilhado:
+    """Divide um limitador entre vários inquilinos (órgãos) de forma justa.
+
+    Cada requisição recebe uma etiqueta de tempo virtual (start-time fair
+    queuing): um inquilino com muitas threads esperando não passa na frente
+    dos outros, as fichas do limitador são distribuídas em rodízio.
+    """
+
+    def __init__(self, limitador):
+        self.limitador = limitador
+        self._cond = threading.Condition()
+        self._espera = []
+        self._virtual = {}
+        self._tempo_global = 0
+        self._sequencia = 0
+        self._ocupado = False
+
+    def para(self, inquilino):
+        return LimitadorInquilino(self, inquilino)
+
+    def aguardar(self, inquilino):
+        with self._cond:
+            etiqueta = max(self._virtual.get(inquilino, 0), self._tempo_global) + 1
+            self._virtual[inquilino] = etiqueta
+            self._sequencia += 1
+            pedido = (etiqueta, self._sequencia)
+            heapq.heappush(self._espera, pedido)
+            while self._ocupado or self._espera[0] != pedido:
+                self._cond.wait()
+            heapq.heappop(self._espera)
+            self._ocupado = True
+            self._tempo_global = etiqueta
+        try:
+            self.limitador.aguardar()
+        finally:
+            with self._cond:
+                self._ocupado = False
+                self._cond.notify_all()
+
+
+class LimitadorInquilino:
+    """Visão de um inquilino sobre o OrcamentoCompartilhado, com a interface do limitador."""
+
+    def __init__(self, orcamento, inquilino):
+        self.orcamento = orcamento
+        self.inquilino = inquilino
+
+    @property
+    def taxa_efetiva(self):
+        return self.orcamento.limitador.taxa_efetiva
+
+    def aguardar(self):
+        self.orcamento.aguardar(self.inquilino)
+
+    def registrar_resposta(self, status, retry_after=None):
+        self.orcamento.limitador.registrar_resposta(status, retry_after)
+
+    def estatisticas(self):
+        return self.orcamento.limitador.estatisticas()
@@ -0,0 +1,285 @@
+"""Servidor local que imita a API do PNCP para testes sem acessar pncp.gov.br.
+
+Atende os endpoints usados pelo importador e pelo refresh:
+- /v1/contratacoes/publicacao (paginado, filtrado por data e modalidade);
+- /v1/orgaos/{cnpj}/compras/{ano}/{sequencial};
+- /v1/orgaos/{cnpj}/compras/{ano}/{sequencial}/itens[/{numero}[/resultados]].
+
+Os dados são sintéticos e determinísticos (mesma semente, mesmas compras).
+Latência, tamanho máximo de página, erros 5xx aleatórios e o throttling
+(429 com `Retry-After` acima de `capacidade` req/s) são configuráveis.
+`rodada` simula a passagem do tempo: a cada rodada parte dos itens em
+andamento é homologada, o que dá trabalho de verdade ao refresh.
+
+Rodando como script, mede a taxa para a qual o LimitadorAdaptativo converge
+contra o servidor simulado.
+"""
+import argparse
+import json
+import random
+import re
+import threading
+import time
+from datetime import datetime, timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+from limitador import LimitadorTaxa
+
+CNPJ_PADRAO = "13650403000128"
+MODALIDADES = [1, 2, 3, 4, 5, 6, 8, 9, 10, 11, 12, 13]
+NOMES_MODALIDADES = {6: "Pregão - Eletrônico", 8: "Dispensa", 9: "Inexigibilidade"}
+PALAVRAS = ["aquisição", "material", "escritório", "serviço", "manutenção", "limpeza",
+            "medicamento", "veículo", "combustível", "informática", "merenda", "reforma"]
+FORNECEDORES = [("11111111000111", "Comercial Silva LTDA"), ("22222222000122", "Distribuidora Nordeste"),
+                ("33333333000133", "Tech Soluções ME")]
+
+
+class DadosSinteticos:
+    """Gera compras, itens e resultados de forma determinística a partir da semente."""
+
+    def __init__(self, compras=100, itens_por_compra=20, data_inicial="20250101", dias=90,
+                 cnpj=CNPJ_PADRAO, semente=42):
+        self.cnpj = cnpj
+        self.semente = semente
+        self.itens_por_compra = itens_por_compra
+        self.rodada = 0
+        inicio = datetime.strptime(data_inicial, "%Y%m%d")
+        aleatorio = random.Random(semente)
+        self.contratacoes = {}
+        for sequencial in range(1, compras + 1):
+            publicacao = inicio + timedelta(days=aleatorio.randrange(dias), seconds=aleatorio.randrange(86400))
+            modalidade = aleatorio.choice(MODALIDADES)
+            self.contratacoes[(str(publicacao.year), str(sequencial))] = {
+                "orgaoEntidade": {"cnpj": cnpj, "razaoSocial": "MUNICIPIO DE TESTE"},
+                "anoCompra": publicacao.year,
+                "sequencialCompra": sequencial,
+                "numeroCompra": f"{sequencial:05d}/{publicacao.year}",
+                "modalidadeId": modalidade,
+                "modalidadeNome": NOMES_MODALIDADES.get(modalidade, f"Modalidade {modalidade}"),
+                "objetoCompra": " ".join(aleatorio.choices(PALAVRAS, k=6)),
+                "processo": f"PROC-{sequencial}",
+                "dataPublicacaoPncp": publicacao.isoformat(),
+                "_quantidadeItens": aleatorio.randint(1, itens_por_compra),
+            }
+
+    def _aleatorio(self, *partes):
+        # Semente em texto: estável entre processos (hash() de str é aleatorizado)
+        return random.Random(":".join(map(str, (self.semente,) + partes)))
+
+    def listar(self, data_inicial, data_final, modalidade=None):
+        inicio = datetime.strptime(data_inicial, "%Y%m%d")
+        fim = datetime.strptime(data_final, "%Y%m%d") + timedelta(days=1)
+        encontradas = [
+            c for c in self.contratacoes.values()
+            if inicio <= datetime.fromisoformat(c["dataPublicacaoPncp"]) < fim
+            and (modalidade is None or c["modalidadeId"] == modalidade)
+        ]
+        return sorted(encontradas, key=lambda c: c["dataPublicacaoPncp"])
+
+    def contratacao(self, ano, sequencial):
+        return self.contratacoes.get((str(ano), str(sequencial)))
+
+    def situacao(self, ano, sequencial, numero):
+        aleatorio = self._aleatorio("situacao", str(ano), str(sequencial), numero)
+        sorteio = aleatorio.random()
+        if sorteio < 0.1:
+            return "Fracassado"
+        # A cada rodada, metade dos itens ainda em andamento é homologada
+        for _ in range(self.rodada + 1):
+            if sorteio < 0.5:
+                return "Homologado"
+            sorteio = aleatorio.random()
+        return "Em andamento"
+
+    def itens(self, ano, sequencial):
+        contratacao = self.contratacao(ano, sequencial)
+        if not contratacao:
+            return []
+        itens = []
+        for numero in range(1, contratacao["_quantidadeItens"] + 1):
+            aleatorio = self._aleatorio("item", str(ano), str(sequencial), numero)
+            quantidade = aleatorio.randint(1, 500)
+            unitario = round(aleatorio.uniform(1, 2000), 2)
+            situacao = self.situacao(ano, sequencial, numero)
+            itens.append({
+                "numeroItem": numero,
+                "descricao": " ".join(aleatorio.choices(PALAVRAS, k=4)),
+                "quantidade": quantidade,
+                "unidadeMedida": aleatorio.choice(["UN", "CX", "KG", "L"]),
+                "valorUnitarioEstimado": unitario,
+                "valorTotal": round(unitario * quantidade, 2),
+                "situacaoCompraItemNome": situacao,
+                "temResultado": situacao == "Homologado",
+            })
+        return itens
+
+    def resultados(self, ano, sequencial, numero):
+        itens = self.itens(ano, sequencial)
+        if not 1 <= numero <= len(itens) or not itens[numero - 1]["temResultado"]:
+            return []
+        item = itens[numero - 1]
+        aleatorio = self._aleatorio("resultado", str(ano), str(sequencial), numero)
+        cnpj, nome = aleatorio.choice(FORNECEDORES)
+        unitario = round(item["valorUnitarioEstimado"] * aleatorio.uniform(0.7, 1.0), 2)
+        publicacao = datetime.fromisoformat(self.contratacao(ano, sequencial)["dataPublicacaoPncp"])
+        return [{
+            "niFornecedor": cnpj,
+            "nomeRazaoSocialFornecedor": nome,
+            "quantidadeHomologada": item["quantidade"],
+            "valorUnitarioHomologado": unitario,
+            "valorTotalHomologado": round(unitario * item["quantidade"], 2),
+            "dataResultado": (publicacao + timedelta(days=15)).isoformat(),
+        }]
+
+
+def _publica(contratacao):
+    return {k: v for k, v in contratacao.items() if not k.startswith('_')}
+
+
+ROTA_COMPRA = re.compile(r'^/v1/orgaos/(\d+)/compras/(\d+)/(\d+)(/itens(?:/(\d+)(/resultados)?)?)?$')
+
+
+class MockPNCPHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    # Cabeçalho e corpo saem em writes separados; com Nagle ligado cada
+    # resposta esperaria o ACK atrasado (~40ms) em conexões keep-alive.
+    disable_nagle_algorithm = True
+
+    def log_message(self, format, *args):
+        pass
+
+    def _responder(self, status, corpo=None, headers=None):
+        dados = b"" if status == 204 else json.dumps(corpo if corpo is not None else [], ensure_ascii=False).encode('utf-8')
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(dados)))
+        for nome, valor in (headers or {}).items():
+            self.send_header(nome, valor)
+        self.end_headers()
+        self.wfile.write(dados)
+        self.server.registrar_bytes(len(dados))
+
+    def do_GET(self):
+        servidor = self.server
+        permitido = servidor.limite.tentar_consumir()
+        falha = servidor.probabilidade_5xx and servidor.aleatorio.random() < servidor.probabilidade_5xx
+        servidor.registrar(permitido, falha)
+        if servidor.latencia:
+            time.sleep(servidor.latencia)
+        if not permitido:
+            self._responder(429, {"erro": "Too Many Requests"}, {"Retry-After": str(servidor.retry_after)})
+            return
+        if falha:
+            self._responder(503, {"erro": "Service Unavailable"})
+            return
+
+        url = urlparse(self.path)
+        params = {k: v[0] for k, v in parse_qs(url.query).items()}
+        dados = servidor.dados
+        if url.path == "/v1/contratacoes/publicacao":
+            modalidade = params.get("codigoModalidadeContratacao")
+            encontradas = dados.listar(params["dataInicial"], params["dataFinal"], int(modalidade) if modalidade else None)
+            tamanho = min(int(params.get("tamanhoPagina", 10)), servidor.tamanho_pagina_max)
+            pagina = int(params.get("pagina", 1))
+            if not encontradas:
+                self._responder(204, None)
+                return
+            fatia = encontradas[(pagina - 1) * tamanho: pagina * tamanho]
+            self._responder(200, {
+                "data": [_publica(c) for c in fatia],
+                "totalRegistros": len(encontradas),
+                "totalPaginas": -(-len(encontradas) // tamanho),
+                "numeroPagina": pagina,
+            })
+            return
+
+        rota = ROTA_COMPRA.match(url.path)
+        if not rota:
+            self._responder(404, {"erro": "Not Found"})
+            return
+        _, ano, sequencial, sufixo_itens, numero, sufixo_resultados = rota.groups()
+        contratacao = dados.contratacao(ano, sequencial)
+        if not contratacao:
+            self._responder(404, {"erro": "Not Found"})
+        elif not sufixo_itens:
+            self._responder(200, _publica(contratacao))
+        elif numero is None:
+            tamanho = min(int(params.get("tamanhoPagina", 100)), 100)
+            pagina = int(params.get("pagina", 1))
+            self._responder(200, dados.itens(ano, sequencial)[(pagina - 1) * tamanho: pagina * tamanho])
+        elif sufixo_resultados:
+            self._responder(200, dados.resultados(ano, sequencial, int(numero)))
+        else:
+            itens = dados.itens(ano, sequencial)
+            indice = int(numero) - 1
+            if 0 <= indice < len(itens):
+                self._responder(200, itens[indice])
+            else:
+                self._responder(404, {"erro": "Not Found"})
+
+
+class MockPNCPServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, porta=0, capacidade=5.0, retry_after=1, dados=None, latencia=0.0,
+                 probabilidade_5xx=0.0, tamanho_pagina_max=50, semente=42):
+        super().__init__(("127.0.0.1", porta), MockPNCPHandler)
+        self.limite = LimitadorTaxa(taxa=capacidade, capacidade=capacidade)
+        self.retry_after = retry_after
+        self.dados = dados or DadosSinteticos(semente=semente)
+        self.latencia = latencia
+        self.probabilidade_5xx = probabilidade_5xx
+        self.tamanho_pagina_max = tamanho_pagina_max
+        self.aleatorio = random.Random(semente)
+        self.lock = threading.Lock()
+        self.total_requisicoes = 0
+        self.total_429 = 0
+        self.total_5xx = 0
+        self.total_bytes = 0
+
+    def registrar(self, permitido, falha):
+        with self.lock:
+            self.total_requisicoes += 1
+            if not permitido:
+                self.total_429 += 1
+            elif falha:
+                self.total_5xx += 1
+
+    def registrar_bytes(self, quantidade):
+        with self.lock:
+            self.total_bytes += quantidade
+
+    @property
+    def url(self):
+        return f"http://127.0.0.1:{self.server_address[1]}"
+
+    def iniciar(self):
+        threading.Thread(target=self.serve_forever, daemon=True).start()
+        return self
+
+
+def simular_throttling(capacidade, duracao, taxa_inicial):
+    from refresh_pncp import PNCPRefresher
+
+    servidor = MockPNCPServer(capacidade=capacidade).iniciar()
+    refresher = PNCPRefresher(requisicoes_por_segundo=taxa_inicial)
+    refresher.BASE_URL_INTEGRACAO = servidor.url
+    inicio = time.monotonic()
+    try:
+        while time.monotonic() - inicio < duracao:
+            refresher.obter_resultados_item(CNPJ_PADRAO, 2025, 1, 1)
+            print(f"  t={time.monotonic() - inicio:5.1f}s taxa={refresher.limitador.taxa_efetiva:.2f} req/s")
+    finally:
+        servidor.shutdown()
+    print(f"Requisições: {servidor.total_requisicoes}, 429: {servidor.total_429}, "
+          f"estatísticas: {refresher.limitador.estatisticas()}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Simula o throttling da API do PNCP")
+    parser.add_argument("--capacidade", type=float, default=5.0, help="Requisições/s aceitas pelo servidor")
+    parser.add_argument("--duracao", type=float, default=30.0, help="Segundos de simulação")
+    parser.add_argument("--taxa-inicial", type=float, default=1.0)
+    args = parser.parse_args()
+    simular_throttling(args.capacidade, args.duracao, args.taxa_inicial)
@@ -0,0 +1,207 @@
+"""Modelo tipado dos registros: Contratacao, Item e Resultado.
+
+Todos os itens de uma compra apontam para a mesma Contratacao (órgão,
+modalidade, objeto e processo não se repetem por item), as strings
+repetitivas são internadas e as datas ficam em ISO 8601. O formato do
+dados.json, com datas como "Mon Dec 01 2025 10:00:00 GMT-0300 (Brasilia
+Standard Time)", só é gerado na exportação (`registro_legado`), sem
+depender de locale. As duas conversões de data são memorizadas (as mesmas
+datas se repetem em todos os itens de uma compra), e os campos da compra
+no registro plano são montados uma vez por Contratacao.
+"""
+from dataclasses import dataclass, field
+from datetime import datetime
+from functools import lru_cache
+from sys import intern
+
+FORMATO_ISO = "%Y-%m-%dT%H:%M:%S"
+DIAS_SEMANA = ("Mon", "Tue", "Wed", "Thu", "Fri", "Sat", "Sun")
+MESES = ("Jan", "Feb", "Mar", "Apr", "May", "Jun", "Jul", "Aug", "Sep", "Oct", "Nov", "Dec")
+SUFIXO_DATA_LEGADA = " GMT-0300 (Brasilia Standard Time)"
+CAMPOS_DATA = ("dataPublicacao", "dataResultado")
+SEM_RESULTADO = "SEM RESULTADO"
+CACHE_DATAS = 4096
+
+
+def _interna(valor):
+    return intern(valor) if isinstance(valor, str) else valor
+
+
+def _digitos(valor):
+    return ''.join(filter(str.isdigit, str(valor or '')))
+
+
+@lru_cache(maxsize=CACHE_DATAS)
+def normalizar_data(valor):
+    """ISO 8601 sem fuso de uma data da API ("2025-12-01T10:00:00") ou do formato legado; "" se vazia ou inválida."""
+    if not valor:
+        return ""
+    try:
+        return datetime.fromisoformat(valor.replace('Z', '+00:00')).strftime(FORMATO_ISO)
+    except ValueError:
+        pass
+    # "Mon Dec 01 2025 10:00:00 GMT-0300 (...)"
+    partes = valor.split()
+    try:
+        horas, minutos, segundos = (int(p) for p in partes[4].split(':'))
+        data = datetime(int(partes[3]), MESES.index(partes[1]) + 1, int(partes[2]), horas, minutos, segundos)
+    except (IndexError, ValueError):
+        return ""
+    return data.strftime(FORMATO_ISO)
+
+
+@lru_cache(maxsize=CACHE_DATAS)
+def formatar_data_legada(valor):
+    """Data ISO no formato do dados.json; valores já no formato legado passam inalterados."""
+    if not valor:
+        return ""
+    try:
+        data = datetime.fromisoformat(valor)
+    except ValueError:
+        return valor
+    return (f"{DIAS_SEMANA[data.weekday()]} {MESES[data.month - 1]} {data.day:02d} {data.year:04d} "
+            f"{data:%H:%M:%S}{SUFIXO_DATA_LEGADA}")
+
+
+def registro_legado(registro):
+    """Cópia do registro com as datas no formato lido pelo index.html."""
+    legado = dict(registro)
+    for campo in CAMPOS_DATA:
+        if campo in legado:
+            legado[campo] = formatar_data_legada(legado[campo])
+    return legado
+
+
+@dataclass(slots=True)
+class Contratacao:
+    cnpj: str
+    ano: int
+    sequencial: int
+    orgao: str
+    compra: str
+    modalidade: str
+    objeto: str
+    processo: str
+    dataPublicacao: str
+    _campos_registro: tuple = field(default=None, init=False, repr=False, compare=False)
+
+    @classmethod
+    def da_api(cls, dados):
+        orgao = dados.get('orgaoEntidade', {})
+        return cls(
+            cnpj=intern(_digitos(orgao.get('cnpj'))),
+            ano=dados.get('anoCompra'),
+            sequencial=dados.get('sequencialCompra'),
+            orgao=_interna(orgao.get('razaoSocial', "")),
+            compra=dados.get('numeroCompra', ""),
+            modalidade=_interna(dados.get('modalidadeNome', "")),
+            objeto=_interna(dados.get('objetoCompra', "")),
+            processo=_interna(dados.get('processo', "")),
+            dataPublicacao=normalizar_data(dados.get('dataPublicacaoPncp')),
+        )
+
+    @property
+    def link(self):
+        return f"https://pncp.gov.br/app/editais/{self.cnpj}/{self.ano}/{self.sequencial}"
+
+    def campos_registro(self):
+        """Campos da compra no registro plano, (antes, depois) dos campos do item; montados uma vez."""
+        if self._campos_registro is None:
+            self._campos_registro = (
+                {
+                    "orgao": self.orgao,
+                    "ano": self.ano,
+                    "compra": self.compra,
+                    "modalidade": self.modalidade,
+                    "objeto": self.objeto,
+                },
+                {
+                    "linkPNCP": self.link,
+                    "processo": self.processo,
+                    "dataPublicacao": self.dataPublicacao,
+                },
+            )
+        return self._campos_registro
+
+
+@dataclass(slots=True)
+class Resultado:
+    vencedor: str = SEM_RESULTADO
+    cnpjVencedor: str = ""
+    valorUnitHomologado: float = 0
+    valorTotalHomologado: float = 0
+    qtdHomologada: float = 0
+    dataResultado: str = ""
+
+    @classmethod
+    def da_api(cls, dados):
+        return cls(
+            vencedor=_interna(dados.get('nomeRazaoSocialFornecedor', SEM_RESULTADO)),
+            cnpjVencedor=_interna(dados.get('niFornecedor', "")),
+            valorUnitHomologado=dados.get('valorUnitarioHomologado', 0),
+            valorTotalHomologado=dados.get('valorTotalHomologado', 0),
+            qtdHomologada=dados.get('quantidadeHomologada', 0),
+            dataResultado=normalizar_data(dados.get('dataResultado')),
+        )
+
+    @classmethod
+    def do_registro(cls, registro):
+        """Resultado já gravado em um registro (para mantê-lo sem consultar a API)."""
+        return cls(
+            vencedor=_interna(registro.get('vencedor')),
+            cnpjVencedor=_interna(registro.get('cnpjVencedor')),
+            valorUnitHomologado=registro.get('valorUnitHomologado'),
+            valorTotalHomologado=registro.get('valorTotalHomologado'),
+            qtdHomologada=registro.get('qtdHomologada'),
+            dataResultado=normalizar_data(registro.get('dataResultado')),
+        )
+
+
+@dataclass(slots=True)
+class Item:
+    contratacao: Contratacao
+    numero: int
+    descricao: str
+    quantidade: float
+    unidade: str
+    valorUnitEstimado: float
+    valorTotalEstimado: float
+    situacao: str
+    resultado: Resultado
+
+    @classmethod
+    def da_api(cls, contratacao, dados, resultados=None):
+        """Item de /itens; `resultados` é a lista de /resultados (vale o primeiro)."""
+        return cls(
+            contratacao=contratacao,
+            numero=dados.get('numeroItem'),
+            descricao=dados.get('descricao', ""),
+            quantidade=dados.get('quantidade', 0),
+            unidade=_interna(dados.get('unidadeMedida', "")),
+            valorUnitEstimado=dados.get('valorUnitarioEstimado', 0),
+            valorTotalEstimado=dados.get('valorTotal', 0),
+            situacao=_interna(dados.get('situacaoCompraItemNome', "")),
+            resultado=Resultado.da_api(resultados[0]) if resultados else Resultado(),
+        )
+
+    def para_registro(self):
+        """Registro plano gravado no banco (datas em ISO; ver registro_legado)."""
+        antes, depois = self.contratacao.campos_registro()
+        resultado = self.resultado
+        return {
+            **antes,
+            "itemNo": self.numero,
+            "descricao": self.descricao,
+            "quantidade": self.quantidade,
+            "unidade": self.unidade,
+            "valorUnitEstimado": self.valorUnitEstimado,
+            "valorTotalEstimado": self.valorTotalEstimado,
+            "vencedor": resultado.vencedor,
+            "cnpjVencedor": resultado.cnpjVencedor,
+            "valorUnitHomologado": resultado.valorUnitHomologado,
+            "valorTotalHomologado": resultado.valorTotalHomologado,
+            "qtdHomologada": resultado.qtdHomologada,
+            "situacaoItem": self.situacao,
+            **depois,
+            "dataResultado": resultado.dataResultado,
+        }
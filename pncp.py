@@ -0,0 +1,35 @@
+"""Linha de comando única do sincronizador do PNCP.
+
+Uso:
+    python pncp.py import [--completo] [--async] ...   # automacao_pncp.py
+    python pncp.py refresh [--orcamento N] ...         # refresh_pncp.py
+    python pncp.py export [--diretorio dados] ...      # exportar_dados.py
+
+Cada subcomando aceita as mesmas opções do script correspondente, que
+continua funcionando sozinho.
+"""
+import argparse
+
+import automacao_pncp
+import exportar_dados
+import refresh_pncp
+
+COMANDOS = {
+    "import": automacao_pncp,
+    "refresh": refresh_pncp,
+    "export": exportar_dados,
+}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Sincronizador de contratações do PNCP")
+    subparsers = parser.add_subparsers(dest="comando", required=True)
+    for nome, modulo in COMANDOS.items():
+        subparser = subparsers.add_parser(nome, help=modulo.DESCRICAO, description=modulo.DESCRICAO)
+        modulo.configurar_argumentos(subparser)
+    args = parser.parse_args()
+    COMANDOS[args.comando].executar(args)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,248 +1,181 @@
-import requests
-import json
-import time
-import os
-import locale
-import re
-from datetime import datetime
-from requests.adapters import HTTPAdapter
-from urllib3.util.retry import Retry
-
-# Tenta configurar para inglês para garantir que a data saia como "Mon Dec"
-try:
-    locale.setlocale(locale.LC_TIME, 'en_US.UTF-8')
-except:
-    pass 
-
-class PNCPRefresher:
-    BASE_URL_CONSULTA = "https://pncp.gov.br/api/consulta"
-    BASE_URL_INTEGRACAO = "https://pncp.gov.br/api/pncp"
-    
-    def __init__(self, cnpj="13650403000128"):
-        self.cnpj = self.limpar_cnpj(cnpj)
-        self.session = self.setup_session()
-        self.cooldown_time = 1.5 # Delay para evitar bloqueio em varreduras longas
-
-    def limpar_cnpj(self, cnpj):
-        return re.sub(r'\D', '', str(cnpj))
-
-    def setup_session(self):
-        session = requests.Session()
-        retry_strategy = Retry(
-            total=5,
-            backoff_factor=2,
-            status_forcelist=[429, 500, 502, 503, 504],
-            allowed_methods=["GET"]
-        )
-        adapter = HTTPAdapter(max_retries=retry_strategy)
-        session.mount("https://", adapter)
-        session.headers.update({
-            "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) PNCP-Explorer-Refresher/1.5",
-            "Accept": "application/json"
-        })
-        return session
-
-    def _safe_request(self, url, params=None):
-        try:
-            time.sleep(self.cooldown_time)
-            response = self.session.get(url, params=params, timeout=30, allow_redirects=True)
-            
-            if response.status_code == 200:
-                return response.json()
-            elif response.status_code == 204:
-                return None
-            elif response.status_code == 404:
-                return None
-            else:
-                print(f"  [!] Aviso: Status {response.status_code} na URL: {url}")
-                return None
-        except Exception as e:
-            print(f"  [!] Erro na requisição: {e}")
-            return None
-
-    def obter_dados_contratacao(self, cnpj, ano, sequencial):
-        cnpj_limpo = self.limpar_cnpj(cnpj)
-        url = f"{self.BASE_URL_CONSULTA}/v1/orgaos/{cnpj_limpo}/compras/{ano}/{sequencial}"
-        return self._safe_request(url)
-
-    def obter_item_especifico(self, cnpj, ano, sequencial, numero_item):
-        cnpj_limpo = self.limpar_cnpj(cnpj)
-        url = f"{self.BASE_URL_INTEGRACAO}/v1/orgaos/{cnpj_limpo}/compras/{ano}/{sequencial}/itens/{numero_item}"
-        return self._safe_request(url)
-
-    def obter_resultados_item(self, cnpj, ano, sequencial, numero_item):
-        cnpj_limpo = self.limpar_cnpj(cnpj)
-        url = f"{self.BASE_URL_INTEGRACAO}/v1/orgaos/{cnpj_limpo}/compras/{ano}/{sequencial}/itens/{numero_item}/resultados"
-        resultados = self._safe_request(url)
-        if isinstance(resultados, list): return resultados
-        if isinstance(resultados, dict): return [resultados]
-        return []
-
-    def formatar_para_html(self, contratacao, item):
-        try:
-            dt_pub_raw = contratacao.get('dataPublicacaoPncp', '')
-            dt_pub_fmt = ""
-            if dt_pub_raw:
-                try:
-                    dt_obj = datetime.fromisoformat(dt_pub_raw.replace('Z', '+00:00'))
-                    dt_pub_fmt = dt_obj.strftime("%a %b %d %Y %H:%M:%S GMT-0300 (Brasilia Standard Time)")
-                except: pass
-
-            vencedor_nome = "SEM RESULTADO"
-            vencedor_cnpj = ""
-            valor_unit_homologado = 0
-            valor_total_homologado = 0
-            qtd_homologada = 0
-            data_resultado_fmt = ""
-
-            resultados = item.get('resultados_vencedores', [])
-            if resultados:
-                res = resultados[0]
-                vencedor_nome = res.get('nomeRazaoSocialFornecedor', "SEM RESULTADO")
-                vencedor_cnpj = res.get('niFornecedor', "")
-                valor_unit_homologado = res.get('valorUnitarioHomologado', 0)
-                valor_total_homologado = res.get('valorTotalHomologado', 0)
-                qtd_homologada = res.get('quantidadeHomologada', 0)
-                dt_res_raw = res.get('dataResultado', '')
-                if dt_res_raw:
-                    try:
-                        dt_res_obj = datetime.fromisoformat(dt_res_raw.replace('Z', '+00:00'))
-                        data_resultado_fmt = dt_res_obj.strftime("%a %b %d %Y %H:%M:%S GMT-0300 (Brasilia Standard Time)")
-                    except: pass
-
-            return {
-                "orgao": contratacao.get('orgaoEntidade', {}).get('razaoSocial', ""),
-                "ano": contratacao.get('anoCompra'),
-                "compra": contratacao.get('numeroCompra', ""),
-                "modalidade": contratacao.get('modalidadeNome', ""),
-                "objeto": contratacao.get('objetoCompra', ""),
-                "itemNo": item.get('numeroItem'),
-                "descricao": item.get('descricao', ""),
-                "quantidade": item.get('quantidade', 0),
-                "unidade": item.get('unidadeMedida', ""),
-                "valorUnitEstimado": item.get('valorUnitarioEstimado', 0),
-                "valorTotalEstimado": item.get('valorTotal', 0),
-                "vencedor": vencedor_nome,
-                "cnpjVencedor": vencedor_cnpj,
-                "valorUnitHomologado": valor_unit_homologado,
-                "valorTotalHomologado": valor_total_homologado,
-                "qtdHomologada": qtd_homologada,
-                "situacaoItem": item.get('situacaoCompraItemNome', ""),
-                "linkPNCP": f"https://pncp.gov.br/app/editais/{self.limpar_cnpj(contratacao.get('orgaoEntidade', {}).get('cnpj'))}/{contratacao.get('anoCompra')}/{contratacao.get('sequencialCompra')}",
-                "processo": contratacao.get('processo', ""),
-                "dataPublicacao": dt_pub_fmt,
-                "dataResultado": data_resultado_fmt
-            }
-        except Exception as e:
-            print(f"Erro na formatação: {e}")
-            return None
-
-def salvar_json(content, file_name):
-    with open(file_name, 'w', encoding='utf-8') as f:
-        json.dump(content, f, indent=4, ensure_ascii=False)
-
-def main():
-    FILE_NAME = 'dados.json'
-    if not os.path.exists(FILE_NAME):
-        print(f"Arquivo {FILE_NAME} não encontrado.")
-        return
-
-    with open(FILE_NAME, 'r', encoding='utf-8') as f:
-        content = json.load(f)
-    
-    is_dict = isinstance(content, dict)
-    dados_lista = content.get('data', []) if is_dict else content
-    
-    if not dados_lista:
-        print("Nenhum dado encontrado no JSON.")
+import argparse
+
+from agendador import ordenar_por_prioridade
+from armazenamento import ArmazemItens, chave_registro
+from cache_http import CacheRespostas
+from cliente_pncp import ClientePNCP
+from instrumentacao import executar_com_relatorio
+from modelo import Contratacao, Resultado
+
+class PNCPRefresher(ClientePNCP):
+    AGENTE = "Mozilla/5.0 (Windows NT 10.0; Win64; x64) PNCP-Explorer-Refresher/1.5"
+
+    def __init__(self, cnpj="13650403000128", max_workers=1, requisicoes_por_segundo=0.66, **kwargs):
+        # Parte do antigo intervalo de 1.5s, uma requisição por vez, e se ajusta conforme as respostas da API
+        super().__init__(cnpj, max_workers, requisicoes_por_segundo, **kwargs)
+
+    def atualizar_item(self, contratacao, item_bruto, item_antigo):
+        """Monta o registro de um item vindo da lista /itens da compra (`contratacao` é a modelo.Contratacao).
+
+        Os resultados só são buscados se a situação do item mudou ou se ele
+        passou a ter resultado; caso contrário os campos de resultado do
+        registro antigo são mantidos.
+        """
+        situacao_mudou = item_bruto.get('situacaoCompraItemNome', "") != item_antigo.get('situacaoItem')
+        resultado_novo = item_bruto.get('temResultado') and item_antigo.get('vencedor') == "SEM RESULTADO"
+        buscar_resultados = situacao_mudou or resultado_novo
+        if buscar_resultados:
+            item_bruto['resultados_vencedores'] = self.obter_resultados_item(
+                contratacao.cnpj, contratacao.ano, contratacao.sequencial, item_bruto.get('numeroItem')
+            )
+
+        item_atualizado = self.montar_item(contratacao, item_bruto)
+        if item_atualizado and not buscar_resultados:
+            item_atualizado.resultado = Resultado.do_registro(item_antigo)
+        return item_atualizado.para_registro() if item_atualizado else None
+
+FILE_NAME = 'dados.json'
+RELATORIO_FILE = 'relatorio_refresh.json'
+
+def atualizar(args, metricas):
+    armazem = ArmazemItens()
+    semeados = armazem.semear_de_json(FILE_NAME)
+    if semeados:
+        print(f"Banco criado a partir do {FILE_NAME} ({semeados} registros).")
+    if not armazem.contar():
+        print("Nenhum dado encontrado no banco.")
         return
 
-    refresher = PNCPRefresher()
+    # O refresh existe para ver mudanças: itens e resultados são sempre
+    # revalidados, mas o que baixar fica no cache para o importador.
+    cache = CacheRespostas(ttls=[("/resultados", 0), ("/itens", 0), ("/compras/", 3600)])
+    refresher = PNCPRefresher(requisicoes_por_segundo=args.taxa, cache=cache, metricas=metricas)
     
     # Status pendentes
     status_para_atualizar = ["Em andamento", "Publicada", "Divulgada", "Em Aberto"]
     
-    indices_para_atualizar = [
-        idx for idx, item in enumerate(dados_lista) 
-        if item.get('situacaoItem') in status_para_atualizar
-    ]
+    pendentes = ordenar_por_prioridade(armazem.pendentes_com_agenda(status_para_atualizar))
+    itens_para_atualizar = [p['registro'] for p in pendentes]
 
-    total_pendentes = len(indices_para_atualizar)
+    total_pendentes = len(itens_para_atualizar)
     if total_pendentes == 0:
         print("Nenhum item com status pendente encontrado.")
         return
 
-    print(f"Iniciando varredura total para {total_pendentes} itens pendentes...")
+    limite = f" (orçamento de {args.orcamento} requisições)" if args.orcamento else ""
+    print(f"Iniciando varredura priorizada de {total_pendentes} itens pendentes{limite}...")
     
     alteracoes = 0
     processados = 0
-    cache_compras = {}
-
-    for idx in indices_para_atualizar:
-        item_antigo = dados_lista[idx]
-        processados += 1
+    atualizados = []
+    verificados = []
+
+    # Agrupa por compra mantendo a ordem de prioridade: cada compra custa uma
+    # consulta da contratação e a lista paginada de /itens, não 2 requisições por item.
+    compras = {}
+    for item in itens_para_atualizar:
+        chave = chave_registro(item)
+        if chave:
+            compras.setdefault(chave[:3], []).append(item)
+
+    for (cnpj_orgao, ano, sequencial), itens_antigos in compras.items():
+        if args.orcamento and refresher.requisicoes >= args.orcamento:
+            print(f"Orçamento de requisições esgotado após {processados} itens.")
+            break
         
         try:
-            link = item_antigo.get('linkPNCP', '')
-            match = re.search(r'editais/(\d+)/(\d+)/(\d+)', link)
-            if not match:
-                continue
-                
-            cnpj_orgao, ano, sequencial = match.groups()
-            num_item = item_antigo.get('itemNo')
-
-            if sequencial not in cache_compras:
-                cache_compras[sequencial] = refresher.obter_dados_contratacao(cnpj_orgao, ano, sequencial)
-            
-            contratacao_nova = cache_compras[sequencial]
+            falhas_antes = refresher.requisicoes_falhas
+            contratacao_nova = refresher.obter_dados_contratacao(cnpj_orgao, ano, sequencial)
             if not contratacao_nova:
+                # Compra fora do PNCP (204/404): conta como verificada sem mudança, senão
+                # continua no topo da fila e gasta o orçamento todo run. Em falha não conta.
+                processados += len(itens_antigos)
+                if refresher.requisicoes_falhas == falhas_antes:
+                    verificados.extend((item_antigo, False) for item_antigo in itens_antigos)
                 continue
+            compra = Contratacao.da_api(contratacao_nova)
 
-            item_novo_bruto = refresher.obter_item_especifico(cnpj_orgao, ano, sequencial, num_item)
-            if not item_novo_bruto:
-                continue
-
-            item_novo_bruto['resultados_vencedores'] = refresher.obter_resultados_item(cnpj_orgao, ano, sequencial, num_item)
-            item_atualizado = refresher.formatar_para_html(contratacao_nova, item_novo_bruto)
-            
-            if item_atualizado:
-                if (item_atualizado['situacaoItem'] != item_antigo['situacaoItem'] or 
-                    item_atualizado['vencedor'] != item_antigo['vencedor'] or
-                    item_atualizado['valorTotalHomologado'] != item_antigo['valorTotalHomologado']):
-                    
-                    print(f"[{processados}/{total_pendentes}] ATUALIZADO: {item_antigo['compra']} Item {num_item} -> {item_atualizado['situacaoItem']}")
-                    dados_lista[idx] = item_atualizado
-                    alteracoes += 1
-                else:
-                    if processados % 50 == 0:
-                        print(f"[{processados}/{total_pendentes}] Verificado (sem mudanças)...")
-
-            # Salvamento progressivo a cada 50 itens para não perder progresso
-            if processados % 50 == 0 and alteracoes > 0:
-                if is_dict:
-                    content['data'] = dados_lista
-                    content['totalRegistros'] = len(dados_lista)
-                    content['geradoEm'] = datetime.now().isoformat()
-                else:
-                    content = dados_lista
-                salvar_json(content, FILE_NAME)
-                print(f"  >> Progresso salvo ({alteracoes} alterações até agora).")
+            itens_brutos = {
+                str(item.get('numeroItem')): item
+                for item in refresher.obter_itens_contratacao(cnpj_orgao, ano, sequencial)
+            }
+            # Com uma página de /itens em falha a lista pode estar incompleta
+            lista_completa = refresher.requisicoes_falhas == falhas_antes
+
+            for item_antigo in itens_antigos:
+                processados += 1
+                num_item = item_antigo.get('itemNo')
+                item_novo_bruto = itens_brutos.get(str(num_item))
+                if not item_novo_bruto:
+                    if lista_completa:
+                        verificados.append((item_antigo, False))
+                    continue
+
+                falhas_item = refresher.requisicoes_falhas
+                item_atualizado = refresher.atualizar_item(compra, item_novo_bruto, item_antigo)
+                if refresher.requisicoes_falhas != falhas_item:
+                    continue  # os resultados não vieram: o item fica para o próximo run
+                if item_atualizado:
+                    metricas.contar("itens")
+                    mudou = (item_atualizado['situacaoItem'] != item_antigo['situacaoItem'] or 
+                        item_atualizado['vencedor'] != item_antigo['vencedor'] or
+                        item_atualizado['valorTotalHomologado'] != item_antigo['valorTotalHomologado'])
+                    verificados.append((item_antigo, mudou))
+                    if mudou:
+                        print(f"[{processados}/{total_pendentes}] ATUALIZADO: {item_antigo['compra']} Item {num_item} -> {item_atualizado['situacaoItem']}")
+                        atualizados.append(item_atualizado)
+                        alteracoes += 1
+                    else:
+                        if processados % 50 == 0:
+                            print(f"[{processados}/{total_pendentes}] Verificado (sem mudanças)...")
 
         except Exception as e:
-            print(f"  [!] Erro ao processar {item_antigo.get('compra')}: {e}")
+            print(f"  [!] Erro ao processar compra {ano}/{sequencial}: {e}")
+
+        # Salvamento progressivo a cada ~50 itens: grava só as linhas alteradas
+        if len(verificados) >= 50:
+            armazem.registrar_verificacoes(verificados)
+            verificados = []
+            if atualizados:
+                with metricas.etapa("gravacao"):
+                    armazem.upsert(atualizados)
+                atualizados = []
+                print(f"  >> Progresso salvo ({alteracoes} alterações até agora).")
 
     # Salvamento final
+    armazem.registrar_verificacoes(verificados)
+    if atualizados:
+        with metricas.etapa("gravacao"):
+            armazem.upsert(atualizados)
     if alteracoes > 0:
-        if is_dict:
-            content['data'] = dados_lista
-            content['totalRegistros'] = len(dados_lista)
-            content['geradoEm'] = datetime.now().isoformat()
-        else:
-            content = dados_lista
-        salvar_json(content, FILE_NAME)
-        print(f"\nVarredura concluída! Total de {alteracoes} registros atualizados.")
+        print(f"\nVarredura concluída! Total de {alteracoes} registros atualizados (rode exportar_dados.py para gerar o {FILE_NAME}).")
     else:
         print("\nVarredura concluída. Nenhuma alteração detectada.")
+    print(f"Requisições feitas: {refresher.requisicoes}. Taxa efetiva final: {refresher.limitador.taxa_efetiva:.2f} req/s")
+    print(f"Cache HTTP: {cache.estatisticas()}")
+    metricas.contar("alteracoes", alteracoes)
+    metricas.anexar("cache", cache.estatisticas())
+    metricas.anexar("limitador", refresher.limitador.estatisticas())
+    refresher.fechar()
+    cache.fechar()
+    armazem.fechar()
+
+DESCRICAO = "Atualiza os itens pendentes, do mais provável de ter mudado ao menos provável"
+
+def configurar_argumentos(parser):
+    parser.add_argument("--orcamento", type=int, default=None,
+                        help="Máximo de requisições à API neste run (padrão: sem limite)")
+    parser.add_argument("--taxa", type=float, default=0.66, help="Requisições/s iniciais (ajustadas pelas respostas da API)")
+    parser.add_argument("--relatorio", default=RELATORIO_FILE, help="JSON com as métricas do run, gravado ao sair")
+    parser.add_argument("--perfil", metavar="ARQUIVO", help="Roda sob o cProfile e grava as estatísticas em ARQUIVO")
+
+def executar(args):
+    executar_com_relatorio(lambda metricas: atualizar(args, metricas), args.relatorio, args.perfil)
+
+def main():
+    parser = argparse.ArgumentParser(description=DESCRICAO)
+    configurar_argumentos(parser)
+    executar(parser.parse_args())
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,184 @@
+"""Sincronização paralela de vários órgãos (CNPJs) com um orçamento de API compartilhado.
+
+Cada órgão é um inquilino com a sua própria fila de trabalho (um
+PNCPImporter varrendo janelas x modalidades) e a sua partição de saída em
+`orgaos/<cnpj>/` (banco dados.sqlite, estado_sync.json com checkpoint e
+marcas d'água próprios e falhas_pncp.sqlite com a fila de falhas, refeita
+depois da varredura). Todos dividem um único LimitadorAdaptativo através de
+um OrcamentoCompartilhado, que reparte as requisições em rodízio: o tempo
+total passa a ser limitado pelo orçamento da API, não pela soma dos órgãos.
+
+Uso:
+    python sync_orgaos.py --cnpjs 13650403000128 12345678000199 --taxa 2
+    python sync_orgaos.py --arquivo orgaos.txt --paralelo 4
+
+Para gerar o dashboard de um órgão:
+    python exportar_dados.py --banco orgaos/<cnpj>/dados.sqlite --saida orgaos/<cnpj>/dados.json --diretorio orgaos/<cnpj>/dados
+"""
+import argparse
+import json
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+
+from armazenamento import DB_FILE, ArmazemItens
+from automacao_pncp import PNCPImporter
+from cache_http import CacheRespostas
+from estado_sync import STATE_FILE, EstadoSync
+from fila_falhas import FALHAS_FILE, FilaFalhas
+from limitador import LimitadorAdaptativo, OrcamentoCompartilhado
+
+DIRETORIO_ORGAOS = 'orgaos'
+PROGRESSO_FILE = 'progresso.json'
+INTERVALO_RELATORIO = 30
+
+
+def diretorio_orgao(cnpj, base=DIRETORIO_ORGAOS):
+    return os.path.join(base, cnpj)
+
+
+class Progresso:
+    """Andamento de cada órgão, impresso periodicamente e gravado em orgaos/progresso.json."""
+
+    def __init__(self, cnpjs, base=DIRETORIO_ORGAOS):
+        self.caminho = os.path.join(base, PROGRESSO_FILE)
+        self._lock = threading.Lock()
+        self.orgaos = {c: {"status": "na fila", "itens": 0, "alterados": 0, "requisicoes": 0, "tempo_s": 0}
+                       for c in cnpjs}
+        self._inicios = {}
+        self._importadores = {}
+
+    def iniciar(self, cnpj, importer):
+        with self._lock:
+            self.orgaos[cnpj]["status"] = "sincronizando"
+            self._inicios[cnpj] = time.time()
+            self._importadores[cnpj] = importer
+
+    def registrar_lote(self, cnpj, itens, alterados):
+        with self._lock:
+            self.orgaos[cnpj]["itens"] += itens
+            self.orgaos[cnpj]["alterados"] += alterados
+
+    def concluir(self, cnpj, status):
+        with self._lock:
+            self._atualizar(cnpj)
+            self.orgaos[cnpj]["status"] = status
+            self._importadores.pop(cnpj, None)
+
+    def _atualizar(self, cnpj):
+        importer = self._importadores.get(cnpj)
+        if importer:
+            self.orgaos[cnpj]["requisicoes"] = importer.requisicoes
+        if cnpj in self._inicios:
+            self.orgaos[cnpj]["tempo_s"] = round(time.time() - self._inicios[cnpj], 1)
+
+    def relatorio(self):
+        with self._lock:
+            for cnpj in self._importadores:
+                self._atualizar(cnpj)
+            linhas = [f"{'cnpj':>14} {'status':>14} {'itens':>7} {'alterados':>9} {'reqs':>6} {'tempo(s)':>9}"]
+            for cnpj, p in self.orgaos.items():
+                linhas.append(f"{cnpj:>14} {p['status']:>14} {p['itens']:>7} {p['alterados']:>9} "
+                              f"{p['requisicoes']:>6} {p['tempo_s']:>9.1f}")
+            retrato = {"atualizadoEm": datetime.now().isoformat(), "orgaos": dict(self.orgaos)}
+        temporario = f"{self.caminho}.tmp"
+        with open(temporario, 'w', encoding='utf-8') as f:
+            json.dump(retrato, f, ensure_ascii=False, indent=4)
+        os.replace(temporario, self.caminho)
+        return "\n".join(linhas)
+
+
+def sincronizar_orgao(cnpj, orcamento, cache, progresso, dias=90, completo=False, base=DIRETORIO_ORGAOS,
+                      limite_falhas=200):
+    """Roda a importação de um órgão na sua partição, limitada pelo orçamento compartilhado."""
+    diretorio = diretorio_orgao(cnpj, base)
+    os.makedirs(diretorio, exist_ok=True)
+    armazem = ArmazemItens(os.path.join(diretorio, DB_FILE))
+    estado = EstadoSync(os.path.join(diretorio, STATE_FILE))
+    falhas = FilaFalhas(os.path.join(diretorio, FALHAS_FILE))
+
+    data_hoje = datetime.now()
+    data_inicio = (data_hoje - timedelta(days=dias)).strftime("%Y%m%d")
+    data_fim = data_hoje.strftime("%Y%m%d")
+    if estado.checkpoint:
+        data_inicio = estado.checkpoint['dataInicial']
+    estado.iniciar_run(data_inicio, data_fim, incremental=not completo)
+
+    importer = PNCPImporter(cnpj=cnpj, cache=cache, limitador=orcamento.para(cnpj), falhas=falhas)
+    progresso.iniciar(cnpj, importer)
+
+    def gravar_lote(itens):
+        progresso.registrar_lote(cnpj, len(itens), armazem.upsert(itens))
+
+    try:
+        importer.importar_em_fluxo(data_inicio, data_fim, gravar_lote, estado, armazem.chaves_compras())
+        estado.concluir()
+        # Como em automacao_pncp.sincronizar: a fila do órgão só é refeita depois da varredura
+        importer.reprocessar_falhas(gravar_lote, armazem.chaves_compras(), limite_falhas)
+        progresso.concluir(cnpj, "concluido")
+    except Exception as e:
+        # O checkpoint fica no estado_sync.json do órgão; o próximo run retoma dali.
+        print(f"[{cnpj}] Falha na sincronização: {e}")
+        progresso.concluir(cnpj, "falhou")
+    finally:
+        importer.fechar()
+        falhas.fechar()
+        armazem.fechar()
+
+
+def ler_cnpjs(args):
+    cnpjs = list(args.cnpjs or [])
+    if args.arquivo:
+        with open(args.arquivo, 'r', encoding='utf-8') as f:
+            cnpjs.extend(linha.strip() for linha in f if linha.strip() and not linha.startswith('#'))
+    # Remove duplicados mantendo a ordem
+    return list(dict.fromkeys(''.join(filter(str.isdigit, c)) for c in cnpjs))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Sincroniza vários órgãos do PNCP em paralelo com um orçamento de API comum")
+    parser.add_argument("--cnpjs", nargs="+", help="CNPJs dos órgãos")
+    parser.add_argument("--arquivo", help="Arquivo com um CNPJ por linha")
+    parser.add_argument("--paralelo", type=int, default=4, help="Órgãos sincronizados ao mesmo tempo")
+    parser.add_argument("--taxa", type=float, default=1.0, help="Requisições/s iniciais, somando todos os órgãos")
+    parser.add_argument("--dias", type=int, default=90)
+    parser.add_argument("--completo", action="store_true", help="Ignora as marcas d'água")
+    parser.add_argument("--diretorio", default=DIRETORIO_ORGAOS, help="Raiz das partições por órgão")
+    parser.add_argument("--limite-falhas", type=int, default=200,
+                        help="Máximo de requisições da fila de falhas reprocessadas por órgão a cada run")
+    args = parser.parse_args()
+
+    cnpjs = ler_cnpjs(args)
+    if not cnpjs:
+        parser.error("informe --cnpjs ou --arquivo")
+
+    os.makedirs(args.diretorio, exist_ok=True)
+    orcamento = OrcamentoCompartilhado(LimitadorAdaptativo(taxa=args.taxa, capacidade=8))
+    cache = CacheRespostas()
+    progresso = Progresso(cnpjs, args.diretorio)
+    print(f"Sincronizando {len(cnpjs)} órgãos ({args.paralelo} por vez) a {args.taxa} req/s no total...")
+
+    fim = threading.Event()
+
+    def relatar():
+        while not fim.wait(INTERVALO_RELATORIO):
+            print(f"\n{progresso.relatorio()}\nTaxa efetiva: {orcamento.limitador.taxa_efetiva:.2f} req/s\n")
+
+    relator = threading.Thread(target=relatar, daemon=True)
+    relator.start()
+    with ThreadPoolExecutor(max_workers=args.paralelo) as executor:
+        for cnpj in cnpjs:
+            executor.submit(sincronizar_orgao, cnpj, orcamento, cache, progresso, args.dias, args.completo, args.diretorio,
+                            args.limite_falhas)
+    fim.set()
+
+    print(f"\n{progresso.relatorio()}")
+    print(f"Cache HTTP: {cache.estatisticas()}")
+    print(f"Limitador: {orcamento.limitador.estatisticas()}")
+    cache.fechar()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,86 @@
+"""Testes do LimitadorAdaptativo, isolado e contra o mock_pncp (python -m pytest)."""
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from cliente_pncp import ClientePNCP
+from fila_falhas import FilaFalhas
+from limitador import TAXA_COOLDOWN, LimitadorAdaptativo, LimitadorTaxa
+from mock_pncp import CNPJ_PADRAO, MockPNCPServer
+
+
+@pytest.fixture
+def servidor():
+    servidor = MockPNCPServer(capacidade=1e9).iniciar()
+    yield servidor
+    servidor.shutdown()
+
+
+def _cliente(servidor, limitador, falhas=None):
+    cliente = ClientePNCP(max_workers=8, max_tentativas=10, limitador=limitador, falhas=falhas)
+    cliente.BASE_URL_CONSULTA = cliente.BASE_URL_INTEGRACAO = servidor.url
+    return cliente
+
+
+def _requisitar(cliente, quantidade):
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        list(executor.map(
+            lambda n: cliente.obter_resultados_item(CNPJ_PADRAO, 2025, 1 + n % 20, 1 + n % 5), range(quantidade)))
+
+
+def test_rajada_de_429_corta_a_taxa_uma_vez():
+    limitador = LimitadorAdaptativo(taxa=1.0, capacidade=8)
+    for _ in range(8):
+        limitador.registrar_resposta(429)
+    assert limitador.taxa_efetiva == 0.5
+    assert limitador.estatisticas()["recuos"] == 1
+
+
+def test_5xx_nao_desce_abaixo_do_cooldown():
+    limitador = LimitadorAdaptativo(taxa=1.0, capacidade=8, janela_recuo=0)
+    for _ in range(50):
+        limitador.registrar_resposta(503)
+    assert limitador.taxa_efetiva == 1.0
+
+    # Recuo suave, e um só para as respostas que já estavam em voo
+    limitador = LimitadorAdaptativo(taxa=8.0, capacidade=8)
+    for _ in range(8):
+        limitador.registrar_resposta(503)
+    assert limitador.taxa_efetiva == pytest.approx(7.2)
+
+
+def test_5xx_aleatorios_nao_derrubam_a_taxa(servidor, tmp_path):
+    servidor.probabilidade_5xx = 0.1
+    limitador = LimitadorAdaptativo(taxa=50, capacidade=8, taxa_max=50)
+    falhas = FilaFalhas(str(tmp_path / "falhas.sqlite"))
+    cliente = _cliente(servidor, limitador, falhas)
+    try:
+        _requisitar(cliente, 300)
+    finally:
+        cliente.fechar()
+    assert falhas.estatisticas()["total"] == 0
+    falhas.fechar()
+    assert servidor.total_5xx > 0
+    assert limitador.taxa_efetiva >= TAXA_COOLDOWN
+    assert limitador.estatisticas()["recuos"] < servidor.total_5xx
+
+
+def test_taxa_se_recupera_depois_do_throttling(servidor):
+    servidor.limite = LimitadorTaxa(taxa=10, capacidade=10)
+    limitador = LimitadorAdaptativo(taxa=40, capacidade=8, taxa_max=40, passo=1)
+    cliente = _cliente(servidor, limitador)
+    try:
+        _requisitar(cliente, 150)
+        assert servidor.total_429 > 0
+        taxa_apos_429 = limitador.taxa_efetiva
+        assert taxa_apos_429 < 40
+
+        # A API volta a aceitar tudo: a taxa sobe de novo até o teto
+        servidor.limite = LimitadorTaxa(taxa=1e9, capacidade=1e9)
+        for _ in range(20):
+            _requisitar(cliente, 50)
+            if limitador.taxa_efetiva >= 40:
+                break
+    finally:
+        cliente.fechar()
+    assert limitador.taxa_efetiva >= 40
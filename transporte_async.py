@@ -0,0 +1,248 @@
+"""Transporte assíncrono (aiohttp) para a API do PNCP.
+
+Mesma superfície do cliente síncrono (`listar_contratacoes`,
+`obter_dados_contratacao`, `obter_itens_contratacao`,
+`obter_resultados_item`), só que em corrotinas sobre uma única
+ClientSession: pool de conexões com tamanho explícito, keep-alive, gzip,
+timeouts de conexão e de leitura separados e decodificação em fluxo das
+listas grandes de /itens. O detalhamento das compras passa a manter muitas
+requisições em voo numa só thread, no ritmo do mesmo limitador.
+
+O ClientePNCP (cliente_pncp.py) usa este transporte com `assincrono=True`
+(`pncp.py import --async`), e é dele toda a lógica que não é I/O.
+Requer o pacote aiohttp.
+"""
+import asyncio
+import codecs
+import json
+import threading
+import time
+
+try:
+    import aiohttp
+except ImportError:  # o transporte síncrono (requests) continua disponível
+    aiohttp = None
+
+TAMANHO_BLOCO = 64 * 1024
+
+
+class DecodificadorLista:
+    """Decodifica um corpo JSON recebido em blocos.
+
+    Se o corpo é uma lista, cada elemento é decodificado assim que chega
+    (o texto já consumido é descartado); qualquer outro JSON é decodificado
+    inteiro no final.
+    """
+
+    def __init__(self):
+        self._utf8 = codecs.getincrementaldecoder('utf-8')()
+        self._json = json.JSONDecoder()
+        self._texto = ""
+        self.lista = None
+        self.elementos = []
+
+    def alimentar(self, bloco):
+        self._texto += self._utf8.decode(bloco)
+        if self.lista is None:
+            conteudo = self._texto.lstrip()
+            if not conteudo:
+                return
+            self.lista = conteudo[0] == '['
+            if self.lista:
+                self._texto = conteudo[1:]
+        if self.lista:
+            self._extrair()
+
+    def _extrair(self):
+        texto, pos = self._texto, 0
+        while True:
+            while pos < len(texto) and texto[pos] in ' \t\r\n,':
+                pos += 1
+            if pos >= len(texto) or texto[pos] == ']':
+                break
+            try:
+                valor, fim = self._json.raw_decode(texto, pos)
+            except json.JSONDecodeError:
+                break  # elemento incompleto: espera o próximo bloco
+            if fim >= len(texto):
+                break  # um número no fim do bloco ainda pode continuar
+            self.elementos.append(valor)
+            pos = fim
+        self._texto = texto[pos:]
+
+    def finalizar(self):
+        self._texto += self._utf8.decode(b'', final=True)
+        if not self.lista:
+            return json.loads(self._texto) if self._texto.strip() else None
+        self._extrair()
+        if self._texto.strip() != "]":
+            raise ValueError("lista JSON incompleta")
+        return self.elementos
+
+
+class TransporteAssincrono:
+    """I/O assíncrono de um ClientePNCP.
+
+    Só a sessão aiohttp e o event loop são daqui; URLs, cache, limitador,
+    tratamento das respostas, fila de falhas e montagem dos itens são os do
+    `cliente`, os mesmos do transporte síncrono.
+    """
+
+    def __init__(self, cliente, conexoes=64, conexoes_por_host=32, keepalive_s=30, timeout_conexao=10,
+                 timeout_leitura=30, max_em_voo=64):
+        if aiohttp is None:
+            raise RuntimeError("O transporte assíncrono requer o pacote aiohttp (pip install aiohttp).")
+        self.cliente = cliente
+        self.conexoes = conexoes
+        self.conexoes_por_host = conexoes_por_host
+        self.keepalive_s = keepalive_s
+        self.timeout_conexao = timeout_conexao
+        self.timeout_leitura = timeout_leitura
+        self.max_em_voo = max_em_voo
+        self._loop = None
+        self._sessao = None
+        self._em_voo = None
+
+    # --- Loop próprio, para ser usado a partir do código síncrono ---
+
+    def executar(self, corrotina):
+        """Roda a corrotina no event loop do transporte (em uma thread própria) e devolve o resultado."""
+        if self._loop is None:
+            self._loop = asyncio.new_event_loop()
+            threading.Thread(target=self._loop.run_forever, daemon=True).start()
+        return asyncio.run_coroutine_threadsafe(corrotina, self._loop).result()
+
+    def fechar(self):
+        if self._loop is None:
+            return
+        if self._sessao is not None:
+            self.executar(self._sessao.close())
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._loop = None
+
+    async def _sessao_http(self):
+        if self._sessao is None:
+            conector = aiohttp.TCPConnector(
+                limit=self.conexoes,
+                limit_per_host=self.conexoes_por_host,
+                keepalive_timeout=self.keepalive_s,
+                ttl_dns_cache=300,
+            )
+            self._sessao = aiohttp.ClientSession(
+                connector=conector,
+                timeout=aiohttp.ClientTimeout(total=None, sock_connect=self.timeout_conexao,
+                                              sock_read=self.timeout_leitura),
+                headers={
+                    "User-Agent": self.cliente.AGENTE,
+                    "Accept": "application/json",
+                    "Accept-Encoding": "gzip, deflate",
+                },
+            )
+            self._em_voo = asyncio.Semaphore(self.max_em_voo)
+        return self._sessao
+
+    async def _aguardar_limitador(self):
+        limitador = self.cliente.limitador
+        aguardar = getattr(limitador, "aguardar_async", None)
+        if aguardar:
+            await aguardar()
+        else:
+            # Limitadores só síncronos (ex.: LimitadorInquilino) esperam fora do loop
+            await asyncio.to_thread(limitador.aguardar)
+
+    async def _safe_request(self, url, params=None, compra=None):
+        """Equivalente assíncrono de ClientePNCP._safe_request."""
+        cliente = self.cliente
+        entrada, headers = cliente._consultar_cache(url, params)
+        if entrada and entrada.fresca:
+            return entrada.dados
+        sessao = await self._sessao_http()
+
+        motivo = "TentativasEsgotadas"
+        for tentativa in range(cliente.max_tentativas):
+            async with self._em_voo:
+                inicio = time.perf_counter()
+                await self._aguardar_limitador()
+                cliente.metricas.espera(time.perf_counter() - inicio)
+                cliente.requisicoes += 1
+                inicio = time.perf_counter()
+                try:
+                    async with sessao.get(url, params=params, headers=headers) as resposta:
+                        dados, tamanho = None, 0
+                        if resposta.status == 200:
+                            decodificador = DecodificadorLista()
+                            async for bloco in resposta.content.iter_chunked(TAMANHO_BLOCO):
+                                tamanho += len(bloco)
+                                decodificador.alimentar(bloco)
+                            dados = decodificador.finalizar()
+                except (aiohttp.ClientConnectionError, asyncio.TimeoutError) as e:
+                    # Falhas de conexão/leitura são repetidas, como o urllib3 faz no transporte síncrono
+                    cliente.metricas.erro(url, e)
+                    motivo = type(e).__name__
+                    continue
+                except Exception as e:
+                    cliente._tratar_erro(url, params, compra, e)
+                    return None
+            concluida, dados = cliente._tratar_resposta(
+                url, params, compra, entrada, resposta.status, resposta.headers, dados,
+                time.perf_counter() - inicio, tamanho, tentativa)
+            if concluida:
+                return dados
+            motivo = "TentativasEsgotadas"
+        cliente._registrar_falha(url, params, compra, motivo)
+        return None
+
+    # --- Mesma superfície do cliente síncrono ---
+
+    async def listar_contratacoes(self, data_inicial, data_final, pagina=1, modalidade=None):
+        cliente = self.cliente
+        url = f"{cliente.BASE_URL_CONSULTA}/v1/contratacoes/publicacao"
+        return await self._safe_request(url, cliente._params_listagem(data_inicial, data_final, pagina, modalidade))
+
+    async def obter_dados_contratacao(self, cnpj, ano, sequencial):
+        url, compra = self.cliente._url_compra(self.cliente.BASE_URL_CONSULTA, cnpj, ano, sequencial)
+        return await self._safe_request(url, compra=compra)
+
+    async def _obter_pagina_itens(self, url, pagina, compra):
+        return self.cliente._lista_itens(await self._safe_request(url, self.cliente._params_itens(pagina), compra))
+
+    async def obter_itens_contratacao(self, cnpj, ano, sequencial):
+        cliente = self.cliente
+        url, compra = cliente._url_compra(cliente.BASE_URL_INTEGRACAO, cnpj, ano, sequencial, "/itens")
+        # Sem total de páginas na resposta: a próxima só é pedida se a anterior veio cheia
+        itens, pagina = [], 1
+        while True:
+            items_list = await self._obter_pagina_itens(url, pagina, compra)
+            itens.extend(items_list)
+            if cliente._pagina_incompleta(items_list):
+                return itens
+            pagina += 1
+
+    async def obter_resultados_item(self, cnpj, ano, sequencial, numero_item):
+        cliente = self.cliente
+        url, compra = cliente._url_compra(cliente.BASE_URL_INTEGRACAO, cnpj, ano, sequencial,
+                                          f"/itens/{numero_item}/resultados")
+        return cliente._lista_resultados(await self._safe_request(url, compra=compra))
+
+    # --- Detalhamento ---
+
+    async def processar_compra(self, contratacao):
+        """Itens (modelo.Item) de uma compra, com os resultados buscados em paralelo."""
+        try:
+            cnpj = contratacao['orgaoEntidade']['cnpj']
+            ano, sequencial = contratacao['anoCompra'], contratacao['sequencialCompra']
+            itens = await self.obter_itens_contratacao(cnpj, ano, sequencial)
+            numerados = [item for item in itens if item.get('numeroItem')]
+            resultados = await asyncio.gather(*(
+                self.obter_resultados_item(cnpj, ano, sequencial, item['numeroItem']) for item in numerados
+            ))
+            for item, resultado in zip(numerados, resultados):
+                item['resultados_vencedores'] = resultado
+            return self.cliente.montar_itens(contratacao, itens)
+        except Exception as e:
+            print(f"Erro no detalhamento: {e}")
+            return []
+
+    async def processar_compras(self, contratacoes):
+        """Lista de itens de cada compra, na ordem das compras."""
+        return await asyncio.gather(*(self.processar_compra(c) for c in contratacoes))